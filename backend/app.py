@@ -1,25 +1,86 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import os
+import sys
+import itertools
+import logging
+import threading
+import time
+import uuid
 import joblib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
 from sklearn.metrics import accuracy_score, classification_report
+from datastore import PartitionStore, file_lock
+from batching import MicroBatcher, LatencyTracker
+from inference import InferenceEngine
+from cache import PredictionCache, row_keys
+from registry import ModelRegistry
+from dedup import DedupIndex, id_keys
+from shadow import ShadowScorer
+from preprocessing import read_koi_csv, clean_koi_frame, load_koi_csv
+from telemetry import MetricsRegistry, Histogram, Gauge, Counter, RequestTrace, RssSampler, LATENCY_BUCKETS, ROW_BUCKETS, RATIO_BUCKETS
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:8080", "http://127.0.0.1:8080"])  # Enable CORS for frontend
 
 # ===================== Configuration =====================
 MODEL_PATH = "xgb_model.pkl"
+MODEL_NATIVE_PATH = "xgb_model.ubj"  # XGBoost native UBJSON, preferred over the pickle at startup
 SCALER_PATH = "scaler.pkl"
-DATA_CSV = "all_data.csv"
+MEDIANS_PATH = "medians.pkl"
+DATA_CSV = "all_data.csv"  # Legacy full-rewrite store, migrated into DATA_STORE_DIR on first boot
+DATA_STORE_DIR = "data_store"
+MAX_STORE_PARTITIONS = 64  # Partitions are merged into one at startup beyond this count
 KEPLER_DATASET = "Kepler_DataSet.csv"
 Keplar_Test_Dataset = "keplartest.csv"
 METRICS_PATH = "metrics.json"
+TEST_SNAPSHOT_PATH = os.path.join("snapshots", "keplartest.npy")  # Parsed test set, rebuilt when the CSV is newer
+MODEL_POINTER_PATH = "model_version.json"  # Points at the current model version; workers watch it to pick up retrains
+ARTIFACT_LOCK_PATH = "artifacts.lock"  # Held exclusively while model artifacts are written, shared while read
+RETRAIN_LOCK_PATH = "retrain.lock"  # Only one process retrains at a time
+MODEL_REGISTRY_DIR = "model_registry"  # One directory per trained model version
+MAX_MODEL_VERSIONS = int(os.environ.get('SARMAD_MAX_MODEL_VERSIONS', 20))  # Older non-production versions are pruned
+PROMOTION_TOLERANCE = float(os.environ.get('SARMAD_PROMOTION_TOLERANCE', 0.0))  # Allowed keplartest accuracy drop for promotion
+SHADOW_SAMPLE_RATE = float(os.environ.get('SARMAD_SHADOW_SAMPLE_RATE', 0.1))  # Fraction of predict requests re-scored by the shadow model
+JOBS_DIR = "jobs"  # Job records shared between worker processes
+INGEST_DIR = "ingest"  # Files uploaded to /ingest wait here until their job has read them
+INGEST_ID_INDEX_PATH = os.path.join(DATA_STORE_DIR, "koi_index.bin")  # (hash, label) of KOI identifiers already ingested
+KOI_ID_COLUMN = 'kepoi_name'  # Identifies a KOI across exports; rows without it are matched on feature values
+MAX_REPORTED_CONFLICTS = 20  # KOI ids listed per file when a re-export changes stored labels
+SHARED_STATE = os.environ.get('SARMAD_SHARED_STATE', '0') == '1'  # Multi-process serving (set by gunicorn.conf.py)
+SHARED_SYNC_INTERVAL = float(os.environ.get('SARMAD_SHARED_SYNC_INTERVAL', 1.0))  # Seconds between checks for other workers' changes
+LAZY_DATA_LOADING = os.environ.get('SARMAD_LAZY_DATA_LOADING', '1') == '1'  # Load datasets after startup instead of before
 UPDATE_THRESHOLD = 200  # Number of new rows required to retrain
+# Training settings, overridable per host through the environment
+TRAIN_TREE_METHOD = os.environ.get('SARMAD_TREE_METHOD', 'hist')
+TRAIN_N_JOBS = int(os.environ.get('SARMAD_N_JOBS', os.cpu_count() or 1))
+TRAIN_N_ESTIMATORS = int(os.environ.get('SARMAD_N_ESTIMATORS', 100))
+TRAIN_MAX_DEPTH = int(os.environ.get('SARMAD_MAX_DEPTH', 5))
+EARLY_STOPPING_ROUNDS = int(os.environ.get('SARMAD_EARLY_STOPPING_ROUNDS', 0))  # 0 disables early stopping
+VALIDATION_FRACTION = float(os.environ.get('SARMAD_VALIDATION_FRACTION', 0.1))  # Held-out split used for early stopping
+INCREMENTAL_RETRAIN = True  # Continue boosting on buffered rows instead of refitting from scratch
+INCREMENTAL_TREES = 20  # Trees added per incremental retrain
+FULL_REBUILD_EVERY = 5  # Incremental retrains allowed before a full refit
+MICROBATCH_MAX_SIZE = int(os.environ.get('SARMAD_MICROBATCH_MAX_SIZE', 64))  # Max /predict_manual rows scored together
+MICROBATCH_WAIT_MS = float(os.environ.get('SARMAD_MICROBATCH_WAIT_MS', 2.0))  # How long the first row waits for company
+PREDICTION_CACHE_SIZE = int(os.environ.get('SARMAD_PREDICTION_CACHE_SIZE', 50000))  # LRU entries, 0 disables the cache
+PREDICTION_CACHE_MAX_ROWS = int(os.environ.get('SARMAD_PREDICTION_CACHE_MAX_ROWS', 1000))  # Larger scoring calls bypass the cache
+BATCH_CHUNK_ROWS = 10000  # Rows per chunk when streaming /predict_batch results
+LOG_LEVEL = os.environ.get('SARMAD_LOG_LEVEL', 'INFO').upper()  # DEBUG adds per-request traces and upload dumps
+
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+logger = logging.getLogger('sarmad')
 
 # ===================== Feature columns =====================
 feature_columns = [
@@ -40,74 +101,229 @@ all_data = pd.DataFrame()
 new_data_buffer = pd.DataFrame()
 current_metrics = {}
 test_data = pd.DataFrame()
+feature_medians = pd.Series(0.0, index=feature_columns)  # Imputation values for the current model
+model_version = None
+label_counts = {}  # Running count of rows per label, maintained as data is appended
+store_position = None  # data_store position already reflected in all_data
+inference_engine = None  # Pandas-free scorer built from the serving model, scaler and medians
+data_store = PartitionStore(DATA_STORE_DIR, feature_columns + ['label'])
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR, MAX_MODEL_VERSIONS)
+shadow_scorer = ShadowScorer(SHADOW_SAMPLE_RATE)
+dedup_index = DedupIndex(feature_columns, INGEST_ID_INDEX_PATH)  # Built on the first /ingest
+ingest_totals = {'rows_added': 0, 'duplicates': 0, 'conflicting_labels': 0, 'rejected': 0}
+last_candidate = None  # Outcome of the most recent promotion decision
+retrain_hold_rows = 0  # Buffered rows when the last candidate was rejected; retraining waits for UPDATE_THRESHOLD more
+model_lock = threading.Lock()  # Guards the swap of model, scaler, medians and version
+data_lock = threading.Lock()  # Guards all_data and new_data_buffer
+test_load_lock = threading.Lock()
+training_load_lock = threading.Lock()
+warmup_lock = threading.Lock()
+warmup_state = {'started_at': time.perf_counter(), 'stages': {}, 'ready_seconds': None}
+
+# ===================== Telemetry =====================
+metrics_registry = MetricsRegistry()
+request_seconds = metrics_registry.register(Histogram('sarmad_request_duration_seconds', 'HTTP request latency until the response is returned', LATENCY_BUCKETS, ('endpoint', 'status')))
+stage_seconds = metrics_registry.register(Histogram('sarmad_stage_duration_seconds', 'Time spent per request stage (parse, validate, impute, scale, predict, serialize, persist)', LATENCY_BUCKETS, ('endpoint', 'stage')))
+rows_scored = metrics_registry.register(Histogram('sarmad_rows_scored', 'Rows per scoring call (per micro-batch for predict_manual)', ROW_BUCKETS, ('endpoint',)))
+cache_hit_ratio = metrics_registry.register(Histogram('sarmad_prediction_cache_hit_ratio', 'Fraction of rows per scoring call served from the prediction cache', RATIO_BUCKETS, ('endpoint',)))
+retrain_seconds_hist = metrics_registry.register(Histogram('sarmad_retrain_duration_seconds', 'Retrain duration including evaluation and artifact writes', LATENCY_BUCKETS, ('mode', 'outcome')))
+buffer_rows_hist = metrics_registry.register(Histogram('sarmad_buffer_rows', 'Buffered (untrained) rows after each upload', ROW_BUCKETS))
+metrics_registry.register(Gauge('sarmad_buffer_rows_current', 'Buffered (untrained) rows right now', lambda: len(new_data_buffer)))
+metrics_registry.register(Gauge('sarmad_training_rows', 'Rows in the training history', lambda: len(all_data)))
+metrics_registry.register(Counter('sarmad_prediction_cache_hits_total', 'Prediction cache hits', lambda: prediction_cache.hits))
+metrics_registry.register(Counter('sarmad_prediction_cache_misses_total', 'Prediction cache misses', lambda: prediction_cache.misses))
+metrics_registry.register(Counter('sarmad_ingested_rows_total', 'New rows appended by /ingest jobs', lambda: ingest_totals['rows_added']))
+metrics_registry.register(Counter('sarmad_ingest_duplicate_rows_total', 'Rows dropped by /ingest jobs as duplicates', lambda: ingest_totals['duplicates']))
+metrics_registry.register(Counter('sarmad_ingest_conflicting_rows_total', 'Rows dropped by /ingest jobs whose label differs from the stored row', lambda: ingest_totals['conflicting_labels']))
+metrics_registry.register(Counter('sarmad_ingest_rejected_rows_total', 'Rows dropped by /ingest jobs as incomplete', lambda: ingest_totals['rejected']))
+metrics_registry.register(Gauge('sarmad_model_info', 'Serving model version', lambda: {(model_version,): 1}, ('version',)))
 
 # ===================== Initialization =====================
 def initialize_system():
-    """Initialize or load existing model and data"""
-    global model, scaler, all_data, new_data_buffer, current_metrics, test_data
+    """Load what predictions need, then bring up test data and training history lazily"""
+    global model, scaler, new_data_buffer, current_metrics, inference_engine
+    warmup_state.update(started_at=time.perf_counter(), stages={'model': 'loading', 'test_data': 'pending', 'training_data': 'pending'}, ready_seconds=None)
     new_data_buffer = pd.DataFrame(columns=feature_columns + ['label'])
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        print("✔ Model and scaler loaded successfully")
-    else:
-        model = XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss', random_state=42, n_estimators=100, max_depth=5)
-        scaler = StandardScaler()
-        print("⚠ No pre-trained model found, created new model")
-    # Load test data if available
-    if os.path.exists(Keplar_Test_Dataset):
-        test_data = pd.read_csv(Keplar_Test_Dataset)
-        if len(test_data) > 0 and 'koi_disposition' in test_data.columns:
-            test_data['label'] = test_data['koi_disposition'].map(LABEL_MAP)
-            test_data = test_data.dropna(subset=['label'])
-            available_features = [col for col in feature_columns if col in test_data.columns]
-            test_data = test_data[available_features + ['label']].copy()
-            for col in feature_columns:
-                if col not in test_data.columns:
-                    test_data[col] = 0
-            test_data = test_data[feature_columns + ['label']]
-            test_data = test_data.dropna(subset=feature_columns)
-            print(f"✔ Loaded {len(test_data)} test rows from {Keplar_Test_Dataset}")
-        else:
-            test_data = pd.DataFrame()
-            print(f"⚠ Test dataset exists but has no valid data")
-    else:
-        test_data = pd.DataFrame()
-        print(f"⚠ No test dataset found at {Keplar_Test_Dataset}")
-
-    if os.path.exists(DATA_CSV):
-        all_data = pd.read_csv(DATA_CSV)
-        print(f"✔ Loaded {len(all_data)} rows from {DATA_CSV}")
-    elif os.path.exists(KEPLER_DATASET):
-        print(f"✔ Initializing with Kepler dataset...")
-        all_data = pd.read_csv(KEPLER_DATASET)
-        if len(all_data) > 0 and 'koi_disposition' in all_data.columns:
-            all_data['label'] = all_data['koi_disposition'].map(LABEL_MAP)
-            all_data = all_data.dropna(subset=['label'])
-            
-            available_features = [col for col in feature_columns if col in all_data.columns]
-            all_data = all_data[available_features + ['label']].copy()
-            for col in feature_columns:
-                if col not in all_data.columns:
-                    all_data[col] = 0
-            all_data = all_data[feature_columns + ['label']]
-            rows_before = len(all_data)
-            all_data = all_data.dropna(subset=feature_columns)
-            print(f"⚠ Removed {rows_before - len(all_data)} rows with missing features")
-            all_data.to_csv(DATA_CSV, index=False)
-            print(f"✔ Prepared {len(all_data)} rows for training")
-            if len(all_data) > 0:
-                retrain_model()
-    else:
-        all_data = pd.DataFrame(columns=feature_columns + ['label'])
-        print("⚠ No existing data found, starting with empty dataset")
     if os.path.exists(METRICS_PATH):
         import json
         with open(METRICS_PATH, 'r') as f:
             current_metrics = json.load(f)
-        print(f"✔ Loaded metrics")
+        logger.info("Loaded metrics")
+    else:
+        current_metrics = {'accuracy': None, 'last_updated': None, 'total_samples': None}
+    if os.path.exists(SCALER_PATH) and (os.path.exists(MODEL_NATIVE_PATH) or os.path.exists(MODEL_PATH)):
+        model = load_native_model(MODEL_NATIVE_PATH) if os.path.exists(MODEL_NATIVE_PATH) else joblib.load(MODEL_PATH)
+        scaler = joblib.load(SCALER_PATH)
+        logger.info("Model and scaler loaded successfully")
+    else:
+        model = build_model()
+        scaler = StandardScaler()
+        logger.warning("No pre-trained model found, created new model")
+    load_feature_medians()
+    inference_engine = build_inference_engine(model, scaler, feature_medians, model_version)
+    set_warmup_stage('model', 'ready' if inference_engine is not None else 'untrained')
+    if LAZY_DATA_LOADING:
+        threading.Thread(target=warm_up_data, name='sarmad-warmup', daemon=True).start()
     else:
-        current_metrics = {'accuracy': None, 'last_updated': None, 'total_samples': len(all_data)}
+        warm_up_data()
+    if SHARED_STATE:
+        threading.Thread(target=watch_shared_state, name='sarmad-shared-sync', daemon=True).start()
+
+def warm_up_data():
+    """Load test data and training history ahead of first use"""
+    try:
+        ensure_test_data()
+        ensure_training_data()
+    except Exception as e:
+        logger.exception("Warm-up error: %s", e)
+
+def set_warmup_stage(stage, status):
+    with warmup_lock:
+        warmup_state['stages'][stage] = status
+        if stage == 'model' and status == 'ready' and warmup_state['ready_seconds'] is None:
+            warmup_state['ready_seconds'] = round(time.perf_counter() - warmup_state['started_at'], 3)
+
+def snapshot_is_fresh(snapshot_path, source_path):
+    return os.path.exists(snapshot_path) and os.path.getmtime(snapshot_path) >= os.path.getmtime(source_path)
+
+def ensure_test_data():
+    """Load the test set on first use, from its binary snapshot when one is up to date"""
+    global test_data
+    with test_load_lock:
+        if warmup_state['stages'].get('test_data') == 'ready':
+            return test_data
+        set_warmup_stage('test_data', 'loading')
+        if os.path.exists(Keplar_Test_Dataset) and snapshot_is_fresh(TEST_SNAPSHOT_PATH, Keplar_Test_Dataset):
+            test_data = pd.DataFrame(np.load(TEST_SNAPSHOT_PATH, mmap_mode='r'), columns=feature_columns + ['label'])
+            logger.info("Loaded %d test rows from snapshot %s", len(test_data), TEST_SNAPSHOT_PATH)
+        elif os.path.exists(Keplar_Test_Dataset):
+            test_data, report = load_koi_csv(Keplar_Test_Dataset, feature_columns, LABEL_MAP)
+            if len(test_data) > 0:
+                os.makedirs(os.path.dirname(TEST_SNAPSHOT_PATH), exist_ok=True)
+                tmp_path = f"{TEST_SNAPSHOT_PATH}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f: np.save(f, test_data.to_numpy())
+                os.replace(tmp_path, TEST_SNAPSHOT_PATH)
+                logger.info("Loaded %d test rows from %s (rejected: %s)", len(test_data), Keplar_Test_Dataset, report['rejected'])
+            else:
+                test_data = pd.DataFrame()
+                logger.warning("Test dataset exists but has no valid data")
+        else:
+            test_data = pd.DataFrame()
+            logger.warning("No test dataset found at %s", Keplar_Test_Dataset)
+        set_warmup_stage('test_data', 'ready')
+        return test_data
+
+def ensure_training_data():
+    """Load the training history on first use, bootstrapping from the Kepler dataset on a first boot"""
+    global all_data, label_counts, store_position, new_data_buffer
+    with training_load_lock:
+        if warmup_state['stages'].get('training_data') == 'ready':
+            return all_data
+        set_warmup_stage('training_data', 'loading')
+        bootstrap = False
+        # Under the store lock, so only one worker process migrates or bootstraps
+        with data_store.lock():
+            if data_store.exists():
+                if data_store.partition_count() > MAX_STORE_PARTITIONS:
+                    data_store.compact()
+                    logger.info("Compacted data store partitions")
+                loaded = data_store.load(mmap=True)
+                logger.info("Loaded %d rows from %s", len(loaded), DATA_STORE_DIR)
+            elif os.path.exists(DATA_CSV):
+                # Old uploads were appended raw, so the legacy file can hold unlabelled or incomplete rows
+                loaded, report = load_koi_csv(DATA_CSV, feature_columns, LABEL_MAP)
+                data_store.append(loaded)
+                logger.info("Migrated %d of %d rows from %s to %s (rejected: %s)", len(loaded), report['rows_read'], DATA_CSV, DATA_STORE_DIR, report['rejected'])
+            elif os.path.exists(KEPLER_DATASET):
+                logger.info("Initializing with Kepler dataset...")
+                loaded, report = load_koi_csv(KEPLER_DATASET, feature_columns, LABEL_MAP)
+                if report['rejected']['missing_features']:
+                    logger.warning("Removed %d rows with missing features", report['rejected']['missing_features'])
+                if len(loaded) > 0:
+                    data_store.append(loaded)
+                    logger.info("Prepared %d rows for training", len(loaded))
+                    bootstrap = True
+            else:
+                loaded = pd.DataFrame(columns=feature_columns + ['label'])
+                logger.warning("No existing data found, starting with empty dataset")
+            position = data_store.position()
+        with data_lock:
+            all_data = loaded
+            label_counts = count_labels(all_data)
+            store_position = position
+            if SHARED_STATE:
+                new_data_buffer = all_data.iloc[trained_row_count():]
+        set_warmup_stage('training_data', 'ready')
+    if bootstrap:
+        # First boot: train in the background so the server accepts traffic right away
+        schedule_retrain(0)
+    return all_data
+
+def sync_training_data():
+    """Pull partitions appended to the data store, by this or any other process, into all_data"""
+    global all_data, new_data_buffer, label_counts, store_position
+    with data_lock:
+        new_rows, position = data_store.load_since(store_position)
+        dedup_index.add_rows(new_rows)
+        if store_position is not None and position[0] != store_position[0]:
+            # Compacted by another process: new_rows is the full store, so replace rather than extend
+            all_data = new_rows
+            label_counts = count_labels(all_data)
+        elif len(new_rows):
+            all_data = pd.concat([all_data, new_rows], ignore_index=True)
+            label_counts = merge_label_counts(label_counts, count_labels(new_rows))
+            if not SHARED_STATE:
+                new_data_buffer = pd.concat([new_data_buffer, new_rows], ignore_index=True) if len(new_data_buffer) else new_rows.reset_index(drop=True)
+        store_position = position
+        if SHARED_STATE:
+            # Shared buffer: every stored row the serving model was not trained on
+            new_data_buffer = all_data.iloc[trained_row_count():]
+        return len(new_rows)
+
+def ensure_dedup_index():
+    """Index the training history for duplicate detection; later rows are indexed by sync_training_data"""
+    if not dedup_index.ready:
+        with data_lock:
+            dedup_index.rebuild(all_data)
+            logger.info("Indexed %d training rows for de-duplication", len(all_data))
+
+def trained_row_count():
+    """Rows of the (append-only) store the serving model was trained on"""
+    return current_metrics.get('total_samples') or 0
+
+def merge_label_counts(counts, new_counts):
+    return {label: counts.get(label, 0) + new_counts.get(label, 0) for label in counts.keys() | new_counts.keys()}
+
+def count_labels(df):
+    """Rows per integer label in df"""
+    if len(df) == 0 or 'label' not in df.columns:
+        return {}
+    return {int(label): int(count) for label, count in df['label'].value_counts().items()}
+
+def compute_feature_medians(df):
+    """Median of each feature column, used to impute missing prediction inputs"""
+    if len(df) == 0:
+        return pd.Series(0.0, index=feature_columns)
+    return df[feature_columns].astype(float).median().fillna(0.0)
+
+def save_feature_medians(medians, version):
+    """Persist the imputation vector next to the scaler, tagged with the model version"""
+    atomic_dump({'model_version': version, 'medians': medians}, MEDIANS_PATH)
+
+def load_feature_medians():
+    """Load the imputation vector saved with the current model, computing it once if missing"""
+    global feature_medians, model_version
+    model_version = current_metrics.get('model_version') or current_metrics.get('last_updated') or 'initial'
+    if os.path.exists(MEDIANS_PATH):
+        saved = joblib.load(MEDIANS_PATH)
+        if saved.get('model_version') == model_version:
+            feature_medians = saved['medians'].reindex(feature_columns).fillna(0.0)
+            logger.info("Loaded imputation medians for model %s", model_version)
+            return
+    feature_medians = compute_feature_medians(ensure_training_data())
+    save_feature_medians(feature_medians, model_version)
+    logger.info("Computed imputation medians for model %s", model_version)
 
 # ===================== Validation Functions =====================
 def validate_csv_structure(df):
@@ -116,7 +332,7 @@ def validate_csv_structure(df):
     
     # Check if CSV has proper headers
     if len(df.columns) == 0:
-        errors.append("CSV file appears to be empty or has no column headers")
+        errors.append("CSV file appears to be empty or has none of the expected column headers")
         return errors
     
     # Check for label column
@@ -143,124 +359,615 @@ def validate_manual_input(data):
     return []
 
 # ===================== Data Processing & Model Training =====================
-def process_uploaded_csv(df):
-    """Process and standardize uploaded CSV with STRICT missing value handling"""
-    print(f"📊 Processing CSV with {len(df)} rows and {len(df.columns)} columns")
-    print(f"📋 Column names: {list(df.columns)[:10]}...")  # Show first 10 columns
-    
-    # Remove completely empty rows
-    df_processed = df.copy().dropna(how='all')
-    print(f"📊 After removing empty rows: {len(df_processed)} rows")
-    
-    # Check if we have any valid data
-    if len(df_processed) == 0:
-        print("✖ No valid data rows found")
-        return df_processed
-    
-    # Handle missing column headers - try to detect if first row is data instead of headers
-    if len(df_processed.columns) > 0 and str(df_processed.columns[0]).startswith('Unnamed'):
-        print("⚠ Detected unnamed columns - CSV may be missing headers")
-        return pd.DataFrame()  # Return empty DataFrame to trigger validation error
-    
-    # Check for feature columns
-    feature_cols_present = [col for col in feature_columns if col in df_processed.columns]
-    print(f"📊 Found {len(feature_cols_present)}/{len(feature_columns)} required feature columns")
-    
-    if len(feature_cols_present) == 0:
-        print("✖ No required feature columns found")
-        return pd.DataFrame()
-    
-    # Remove rows where all present features are missing
-    if feature_cols_present:
-        df_processed = df_processed.dropna(subset=feature_cols_present, how='all')
-        print(f"📊 After removing rows with all missing features: {len(df_processed)} rows")
-    
-    # Handle label column
-    if 'koi_disposition' in df_processed.columns and 'label' not in df_processed.columns:
-        df_processed['label'] = df_processed['koi_disposition'].map(LABEL_MAP)
-        print("📊 Mapped 'koi_disposition' to 'label' column")
-    
-    # Remove rows without labels
-    df_processed = df_processed.dropna(subset=['label'])
-    print(f"📊 After removing rows without labels: {len(df_processed)} rows")
-    
-    if len(df_processed) == 0:
-        print("✖ No rows with valid labels found")
-        return df_processed
-    
-    # Select available features and add missing ones
-    available_features = [col for col in feature_columns if col in df_processed.columns]
-    df_processed = df_processed[available_features + ['label']].copy()
-    
-    # Add missing feature columns with default values
-    for col in feature_columns:
-        if col not in df_processed.columns:
-            df_processed[col] = 0
-            print(f"📊 Added missing column '{col}' with default value 0")
-    
-    df_processed = df_processed[feature_columns + ['label']].copy()
-    
-    # Final cleanup - remove rows with any missing features
-    rows_before = len(df_processed)
-    df_processed = df_processed.dropna(subset=feature_columns)
-    if (rows_before - len(df_processed)) > 0:
-        print(f"⚠ Removed {rows_before - len(df_processed)} rows with missing feature values")
-    
-    # ✅ Ensure consistent column order before returning
-    df_processed = df_processed.reindex(columns=feature_columns + ['label'])
-    
-    # Save clean copy for debugging
-    df_processed.to_csv("processed.csv", index=False)
-    print(f"✅ Final processed data: {len(df_processed)} rows")
-    print("📋 Final columns:", list(df_processed.columns))
-    return df_processed
-
-
-def retrain_model():
-    """Retrain the model on all available data"""
-    global model, scaler, all_data, current_metrics
-    if len(all_data) < 10:
-        print("✖ Not enough data to train model (minimum 10 samples required)")
+def build_model():
+    """Create an untrained classifier with the configured hyperparameters"""
+    return XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss', random_state=42,
+                         n_estimators=TRAIN_N_ESTIMATORS, max_depth=TRAIN_MAX_DEPTH, tree_method=TRAIN_TREE_METHOD,
+                         n_jobs=TRAIN_N_JOBS, early_stopping_rounds=EARLY_STOPPING_ROUNDS or None)
+
+def peak_rss_mb():
+    """Lifetime peak resident set size of this process in MB (ru_maxrss), or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def fit_full(X_scaled, y):
+    """Fit a fresh model, holding out a stratified split for early stopping when enabled"""
+    new_model = build_model()
+    if not EARLY_STOPPING_ROUNDS:
+        new_model.fit(X_scaled, y)
+        return new_model
+    X_train, X_val, y_train, y_val = train_test_split(X_scaled, y, test_size=VALIDATION_FRACTION, random_state=42, stratify=y)
+    new_model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    return new_model
+
+def continue_booster(base_model):
+    """Serving booster trimmed to its best iteration, ready to continue boosting from"""
+    booster = base_model.get_booster()
+    try:
+        return booster[:booster.best_iteration + 1]
+    except AttributeError:  # Trained without early stopping
+        return booster
+
+def atomic_dump(obj, path):
+    """joblib.dump to a temp file and rename it over the target, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def build_inference_engine(fitted_model, fitted_scaler, medians, version):
+    """InferenceEngine for a fitted model, or None while no model has been trained"""
+    try:
+        return InferenceEngine(fitted_model, fitted_scaler, medians.reindex(feature_columns), version)
+    except Exception:
+        return None
+
+def save_native_model(fitted_model, path):
+    """Save in XGBoost's native UBJSON format, which loads much faster than unpickling"""
+    tmp_path = f"{path}.{os.getpid()}.tmp.ubj"
+    fitted_model.save_model(tmp_path)
+    os.replace(tmp_path, path)
+
+def load_native_model(path):
+    loaded = XGBClassifier()
+    loaded.load_model(path)
+    return loaded
+
+def swap_model(new_model, new_scaler, new_medians, new_version, new_metrics):
+    """Atomically replace the serving model, scaler, medians and metrics"""
+    global model, scaler, feature_medians, model_version, current_metrics, inference_engine
+    new_engine = build_inference_engine(new_model, new_scaler, new_medians, new_version)
+    with model_lock:
+        model, scaler, feature_medians, model_version, current_metrics = new_model, new_scaler, new_medians, new_version, new_metrics
+        inference_engine = new_engine
+    if new_engine is not None:
+        set_warmup_stage('model', 'ready')
+    # Keys include the model version, so old entries could never hit again; drop them to free memory
+    prediction_cache.clear()
+    # A shadow candidate was being compared against the model just replaced
+    shadow_scorer.stop()
+
+def serving_snapshot():
+    """Return a consistent (model, scaler, medians) triple for one request"""
+    with model_lock:
+        return model, scaler, feature_medians
+
+def can_continue_training(base_model, new_rows, training):
+    """Whether the next retrain may continue boosting from base_model instead of refitting"""
+    if not INCREMENTAL_RETRAIN or new_rows is None or len(new_rows) == 0:
+        return False
+    if training.get('incremental_rounds', 0) >= FULL_REBUILD_EVERY:
+        return False
+    # XGBClassifier.fit needs every class present to keep the same label encoding
+    if set(pd.unique(new_rows['label'])) != set(REVERSE_LABEL_MAP):
+        return False
+    try:
+        base_model.get_booster()
+        return True
+    except Exception:
+        return False
+
+def retrain_model(new_rows=None):
+    """Train a new scaler and model, then hot-swap them in.
+
+    With new_rows, boosting continues from the serving booster on just those rows (the scaler is
+    kept so existing splits stay valid); every FULL_REBUILD_EVERY rounds a full refit runs instead.
+    The result is registered as a candidate and only replaces production if promotion_decision allows.
+    """
+    global last_candidate, retrain_hold_rows
+    ensure_training_data()
+    with data_lock:
+        data = all_data
+    if len(data) < 10:
+        logger.error("Not enough data to train model (minimum 10 samples required)")
         return None
     try:
-        X = all_data[feature_columns].astype(float)
-        y = all_data['label'].values.astype(int)
-        X_scaled = scaler.fit_transform(X)
-        model.fit(X_scaled, y)
-        y_pred = model.predict(X_scaled)
+        start = time.perf_counter()
+        base_model, base_scaler, _ = serving_snapshot()
+        previous_training = current_metrics.get('training', {})
+        incremental = can_continue_training(base_model, new_rows, previous_training)
+        X = data[feature_columns].astype(float)
+        y = data['label'].values.astype(int)
+        if incremental:
+            new_scaler = base_scaler
+            X_fit = new_scaler.transform(new_rows[feature_columns].astype(float))
+            new_model = build_model().set_params(n_estimators=INCREMENTAL_TREES, early_stopping_rounds=None)
+            fit_start = time.perf_counter()
+            with RssSampler() as fit_rss:
+                new_model.fit(X_fit, new_rows['label'].values.astype(int), xgb_model=continue_booster(base_model))
+            fit_seconds = time.perf_counter() - fit_start
+            X_scaled = new_scaler.transform(X)
+        else:
+            new_scaler = StandardScaler()
+            X_scaled = new_scaler.fit_transform(X)
+            fit_start = time.perf_counter()
+            with RssSampler() as fit_rss:
+                new_model = fit_full(X_scaled, y)
+            fit_seconds = time.perf_counter() - fit_start
+        retrain_seconds = time.perf_counter() - start
+        y_pred = new_model.predict(X_scaled)
         accuracy = accuracy_score(y, y_pred)
         report = classification_report(y, y_pred, output_dict=True, zero_division=0)
-        current_metrics = {
-            'accuracy': round(accuracy, 4), 'last_updated': datetime.now().isoformat(), 'total_samples': len(all_data),
+        trained_at = datetime.now().isoformat()
+        test_metrics = evaluate_test_accuracy(new_model, new_scaler)
+        new_metrics = {
+            'accuracy': round(accuracy, 4), 'last_updated': trained_at, 'model_version': trained_at, 'total_samples': len(data),
             'class_distribution': {'CONFIRMED': int(np.sum(y == 2)), 'CANDIDATE': int(np.sum(y == 1)), 'FALSE_POSITIVE': int(np.sum(y == 0))},
-            'classification_report': {'precision': round(report['weighted avg']['precision'], 4), 'recall': round(report['weighted avg']['recall'], 4), 'f1_score': round(report['weighted avg']['f1-score'], 4)}
+            'classification_report': {'precision': round(report['weighted avg']['precision'], 4), 'recall': round(report['weighted avg']['recall'], 4), 'f1_score': round(report['weighted avg']['f1-score'], 4)},
+            'training': build_training_report(incremental, retrain_seconds, test_metrics, len(new_rows) if incremental else len(data), trained_at, previous_training)
         }
-        joblib.dump(model, MODEL_PATH); joblib.dump(scaler, SCALER_PATH)
-        all_data.to_csv(DATA_CSV, index=False)
-        import json
-        with open(METRICS_PATH, 'w') as f: json.dump(current_metrics, f, indent=2)
-        print(f"✔ Model retrained successfully! Accuracy: {accuracy:.4f}, Total samples: {len(all_data)}")
+        new_metrics['training'].update(build_throughput_report(new_model, fit_seconds, new_metrics['training']['rows_trained'], fit_rss))
+        new_metrics.update(test_metrics)
+        new_medians = compute_feature_medians(data)
+        persist_start = time.perf_counter()
+        model_registry.register(trained_at, new_model, new_scaler, new_medians, new_metrics)
+        persist_seconds = time.perf_counter() - persist_start
+        promote, reason = promotion_decision(new_metrics)
+        last_candidate = {'model_version': trained_at, 'promoted': promote, 'reason': reason, 'test_accuracy': new_metrics.get('test_accuracy')}
+        mode = 'incremental' if incremental else 'full'
+        if not promote:
+            # Production keeps serving; the candidate scores a sample of live traffic for comparison
+            # Its rows stay buffered, so without a hold every later upload would retrain on them again
+            retrain_hold_rows = len(new_rows) if new_rows is not None else 0
+            model_registry.record_rejection(trained_at, reason, retrain_hold_rows)
+            shadow_scorer.start(build_inference_engine(new_model, new_scaler, new_medians, trained_at))
+            stage_seconds.observe(persist_seconds, 'retrain', 'persist')
+            retrain_seconds_hist.observe(time.perf_counter() - start, mode, 'rejected')
+            logger.warning("Candidate model %s not promoted (%s); shadow scoring it against live traffic", trained_at, reason)
+            return accuracy
+        persist_start = time.perf_counter()
+        publish_model(new_model, new_scaler, new_medians, trained_at, new_metrics, reason)
+        stage_seconds.observe(persist_seconds + time.perf_counter() - persist_start, 'retrain', 'persist')
+        retrain_seconds_hist.observe(time.perf_counter() - start, mode, 'promoted')
+        logger.info("Model retrained successfully (%s, %.2fs)! Accuracy: %.4f, Total samples: %d", mode, retrain_seconds, accuracy, len(data))
         return accuracy
     except Exception as e:
-        print(f"✖ Error retraining model: {str(e)}")
+        logger.exception("Error retraining model: %s", e)
         return None
 
+# ===================== Model Registry =====================
+def promotion_decision(candidate_metrics):
+    """(promote, reason): a candidate is promoted unless its keplartest accuracy regresses on production's"""
+    candidate_accuracy = candidate_metrics.get('test_accuracy')
+    if inference_engine is None:
+        return True, "no trained production model"
+    if candidate_accuracy is None:
+        return True, "no test set to compare on"
+    production_accuracy = current_metrics.get('test_accuracy')
+    if production_accuracy is None:
+        production_model, production_scaler, _ = serving_snapshot()
+        production_accuracy = evaluate_test_accuracy(production_model, production_scaler).get('test_accuracy')
+    comparison = f"test accuracy {candidate_accuracy:.4f} vs production {production_accuracy:.4f}"
+    if candidate_accuracy + PROMOTION_TOLERANCE >= production_accuracy:
+        return True, comparison
+    return False, comparison
+
+def publish_model(new_model, new_scaler, new_medians, version, metrics, reason):
+    """Make version the production model: serving artifacts, version pointer, registry and this process"""
+    global retrain_hold_rows
+    with file_lock(ARTIFACT_LOCK_PATH):
+        save_native_model(new_model, MODEL_NATIVE_PATH); atomic_dump(new_model, MODEL_PATH); atomic_dump(new_scaler, SCALER_PATH); save_feature_medians(new_medians, version)
+        save_metrics(metrics)
+        write_model_pointer(version)
+        model_registry.set_production(version, reason)
+    swap_model(new_model, new_scaler, new_medians, version, metrics)
+    retrain_hold_rows = 0
+
+def evaluate_test_accuracy(test_model, test_scaler):
+    """Accuracy on the held-out test set, stored with the model version it was measured on"""
+    test_data = ensure_test_data()
+    if len(test_data) == 0:
+        return {}
+    X = test_data[feature_columns].astype(float)
+    y = test_data['label'].values.astype(int)
+    test_acc = accuracy_score(y, test_model.predict(test_scaler.transform(X)))
+    logger.info("Test accuracy calculated: %.4f", test_acc)
+    return {'test_accuracy': round(test_acc, 4), 'test_samples': len(test_data)}
+
+def save_metrics(metrics):
+    import json
+    tmp_path = f"{METRICS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f: json.dump(metrics, f, indent=2)
+    os.replace(tmp_path, METRICS_PATH)
+
+def build_training_report(incremental, retrain_seconds, test_metrics, rows_trained, trained_at, previous):
+    """Retrain timing and held-out test accuracy, compared against the most recent full refit"""
+    report = {'mode': 'incremental' if incremental else 'full', 'retrain_seconds': round(retrain_seconds, 3), 'rows_trained': rows_trained}
+    if not incremental:
+        report['incremental_rounds'] = 0
+        report['full_refit'] = {'test_accuracy': test_metrics.get('test_accuracy'), 'test_samples': test_metrics.get('test_samples'),
+                                'retrain_seconds': round(retrain_seconds, 3), 'model_version': trained_at}
+        return report
+    report['incremental_rounds'] = previous.get('incremental_rounds', 0) + 1
+    full_refit = previous.get('full_refit')
+    if full_refit:
+        report['full_refit'] = full_refit
+        # Only meaningful when both models were scored on the same test set
+        if full_refit.get('test_accuracy') is not None and test_metrics.get('test_samples') == full_refit.get('test_samples'):
+            report['test_accuracy_vs_full_refit'] = round(test_metrics['test_accuracy'] - full_refit['test_accuracy'], 4)
+        report['speedup_vs_full_refit'] = round(full_refit['retrain_seconds'] / max(retrain_seconds, 1e-6), 2)
+    return report
+
+def build_throughput_report(new_model, fit_seconds, rows_trained, fit_rss):
+    """Fit wall-clock, rows/sec, memory sampled during the fit and the settings that produced them"""
+    report = {'fit_seconds': round(fit_seconds, 3), 'rows_per_sec': round(rows_trained / max(fit_seconds, 1e-6), 1),
+              **fit_rss.report('fit'), 'tree_method': TRAIN_TREE_METHOD, 'n_jobs': TRAIN_N_JOBS,
+              'boosted_rounds': new_model.get_booster().num_boosted_rounds()}
+    if EARLY_STOPPING_ROUNDS:
+        try:
+            report['best_iteration'] = new_model.best_iteration
+        except AttributeError:  # Incremental rounds run without early stopping
+            pass
+    return report
+
+# ===================== Multi-process Coordination =====================
+def write_model_pointer(version):
+    """Atomically publish the current model version for other worker processes"""
+    import json
+    tmp_path = f"{MODEL_POINTER_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f: json.dump({'model_version': version}, f)
+    os.replace(tmp_path, MODEL_POINTER_PATH)
+
+def read_model_pointer():
+    if not os.path.exists(MODEL_POINTER_PATH):
+        return None
+    import json
+    with open(MODEL_POINTER_PATH, 'r') as f: return json.load(f)
+
+def sync_model_from_pointer():
+    """Load and swap in the model another worker published, if the pointer has moved past ours"""
+    pointer = read_model_pointer()
+    if not pointer or pointer['model_version'] == model_version:
+        return False
+    import json
+    with file_lock(ARTIFACT_LOCK_PATH, exclusive=False):
+        with open(METRICS_PATH, 'r') as f: metrics = json.load(f)
+        saved = joblib.load(MEDIANS_PATH)
+        new_model = load_native_model(MODEL_NATIVE_PATH)
+        new_scaler = joblib.load(SCALER_PATH)
+    if saved.get('model_version') != pointer['model_version'] or metrics.get('model_version') != pointer['model_version']:
+        return False
+    swap_model(new_model, new_scaler, saved['medians'].reindex(feature_columns).fillna(0.0), pointer['model_version'], metrics)
+    logger.info("Picked up model %s published by another worker", pointer['model_version'])
+    return True
+
+def watch_shared_state():
+    """Worker-side watcher: follow the model version pointer and other workers' data appends"""
+    while True:
+        time.sleep(SHARED_SYNC_INTERVAL)
+        try:
+            if sync_model_from_pointer() or warmup_state['stages'].get('training_data') == 'ready':
+                sync_training_data()
+        except Exception as e:
+            logger.exception("Shared state sync error: %s", e)
+
+# ===================== Background Jobs =====================
+MAX_TRACKED_JOBS = 200
+job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sarmad-job')
+ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sarmad-ingest')  # Ingestion never waits behind a retrain
+jobs = {}
+jobs_lock = threading.Lock()
+retrain_schedule_lock = threading.Lock()
+retrain_job_id = None
+
+def submit_job(job_type, fn, *args, executor=None):
+    """Run fn(*args) on the background worker (or executor) and return its job record"""
+    job = {'id': uuid.uuid4().hex, 'type': job_type, 'status': 'queued', 'submitted_at': datetime.now().isoformat(),
+           'started_at': None, 'finished_at': None, 'result': None, 'error': None}
+    with jobs_lock:
+        jobs[job['id']] = job
+        persist_job(job)
+        finished = [jid for jid, j in jobs.items() if j['status'] in ('completed', 'failed')]
+        for jid in finished[:max(0, len(jobs) - MAX_TRACKED_JOBS)]:
+            del jobs[jid]
+            if SHARED_STATE and os.path.exists(os.path.join(JOBS_DIR, f"{jid}.json")):
+                os.remove(os.path.join(JOBS_DIR, f"{jid}.json"))
+    (executor or job_executor).submit(run_job, job, fn, args)
+    return job
+
+def run_job(job, fn, args):
+    """Execute a job and record its outcome"""
+    with jobs_lock:
+        job.update(status='running', started_at=datetime.now().isoformat())
+        persist_job(job)
+    try:
+        result = fn(*args)
+        with jobs_lock:
+            job.update(status='completed', result=result, finished_at=datetime.now().isoformat())
+            persist_job(job)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed: %s", job['id'], job['type'], e)
+        with jobs_lock:
+            job.update(status='failed', error=str(e), finished_at=datetime.now().isoformat())
+            persist_job(job)
+
+def persist_job(job):
+    """In multi-process mode, write the job record where every worker can read it"""
+    if not SHARED_STATE:
+        return
+    import json
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = os.path.join(JOBS_DIR, f"{job['id']}.json")
+    with open(f"{path}.tmp", 'w') as f: json.dump(job, f)  # Only the owning worker writes a job's record
+    os.replace(f"{path}.tmp", path)
+
+def get_job(job_id):
+    """Return a copy of a job record, or None if unknown"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job:
+            return dict(job)
+    path = os.path.join(JOBS_DIR, f"{job_id}.json")
+    if SHARED_STATE and job_id.isalnum() and os.path.exists(path):
+        import json
+        with open(path, 'r') as f: return json.load(f)
+    return None
+
+def retrain_job(buffered_rows):
+    """Background retrain; once its model is promoted, drops the rows it consumed from new_data_buffer"""
+    global new_data_buffer
+    if SHARED_STATE:
+        return shared_retrain_job(buffered_rows)
+    with data_lock:
+        new_rows = new_data_buffer.iloc[:buffered_rows]
+    acc = retrain_model(new_rows)
+    if acc is None:
+        raise RuntimeError("Model retraining failed")
+    if last_candidate['promoted']:
+        # A rejected candidate leaves its rows buffered for the next retrain
+        with data_lock:
+            new_data_buffer = new_data_buffer.iloc[buffered_rows:].reset_index(drop=True)
+    return {"training_accuracy": round(acc, 4), "model_version": model_version, "candidate": last_candidate, "metrics": current_metrics}
+
+def shared_retrain_job(buffered_rows):
+    """Multi-process retrain: one worker at a time trains on the shared buffer and publishes the result"""
+    global retrain_hold_rows
+    with file_lock(RETRAIN_LOCK_PATH, blocking=False) as acquired:
+        if not acquired:
+            return {"status": "skipped", "reason": "Another worker is already retraining"}
+        sync_model_from_pointer()
+        sync_training_data()
+        with data_lock:
+            new_rows = new_data_buffer
+        retrain_hold_rows = model_registry.retrain_hold()  # Possibly set by another worker's rejected candidate
+        if buffered_rows and not retrain_due(len(new_rows)):
+            return {"status": "skipped", "reason": "Fewer than UPDATE_THRESHOLD new rows since the last retrain"}
+        acc = retrain_model(new_rows)
+        if acc is None:
+            raise RuntimeError("Model retraining failed")
+        sync_training_data()
+    return {"training_accuracy": round(acc, 4), "model_version": model_version, "candidate": last_candidate, "metrics": current_metrics}
+
+def retrain_due(buffer_rows):
+    """Whether enough rows are buffered to retrain, counting only rows added since a rejected candidate"""
+    return buffer_rows >= retrain_hold_rows + UPDATE_THRESHOLD
+
+def schedule_retrain(buffered_rows):
+    """Queue a retrain job unless one is already queued or running"""
+    global retrain_job_id
+    with retrain_schedule_lock:
+        active = get_job(retrain_job_id) if retrain_job_id else None
+        if active and active['status'] in ('queued', 'running'):
+            return active
+        job = submit_job('retrain', retrain_job, buffered_rows)
+        retrain_job_id = job['id']
+        return job
+
+def ingest_suffix(filename):
+    """Spool file extension that keeps pandas' compression inference working"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    return ext if ext in ('.gz', '.bz2', '.xz', '.zip', '.zst') else '.csv'
+
+def ingest_file(path):
+    """Parse, clean and de-duplicate one spooled CSV, appending only rows not stored before"""
+    df = read_koi_csv(path, feature_columns, [KOI_ID_COLUMN])
+    errors = validate_csv_structure(df)
+    if errors:
+        return {'errors': errors}
+    cleaned, report = clean_koi_frame(df, feature_columns, LABEL_MAP, [KOI_ID_COLUMN])
+    ids = id_keys(cleaned[KOI_ID_COLUMN]) if KOI_ID_COLUMN in cleaned.columns else None
+    # Under the store lock, no process appends between the duplicate check and this append
+    with data_store.lock():
+        sync_training_data()
+        keep, conflicting = dedup_index.check_rows(cleaned, ids)
+        data_store.append(cleaned[keep])
+        if ids is not None:
+            dedup_index.record_ids(ids[keep], cleaned['label'].to_numpy()[keep])
+        sync_training_data()
+    # Rows matching a stored row but with another label are still dropped, and reported separately
+    report.update(duplicates=int((~keep & ~conflicting).sum()), conflicting_labels=int(conflicting.sum()), rows_added=int(keep.sum()))
+    if report['conflicting_labels'] and KOI_ID_COLUMN in cleaned.columns:
+        report['conflicting_ids'] = cleaned[KOI_ID_COLUMN][conflicting].head(MAX_REPORTED_CONFLICTS).tolist()
+    return report
+
+def ingest_job(files):
+    """Background ingestion of spooled uploads; schedules a retrain once enough new rows are buffered"""
+    ensure_training_data()
+    ensure_dedup_index()
+    results = []
+    try:
+        for path, name in files:
+            try:
+                report = ingest_file(path)
+            except Exception as e:
+                report = {'errors': [str(e)]}
+            report['file'] = name
+            results.append(report)
+            if 'errors' not in report:
+                ingest_totals['rows_added'] += report['rows_added']
+                ingest_totals['duplicates'] += report['duplicates']
+                ingest_totals['conflicting_labels'] += report['conflicting_labels']
+                ingest_totals['rejected'] += report['rows_read'] - report['rows_accepted']
+            logger.info("Ingested %s: %s", name, report)
+            if report.get('conflicting_labels'):
+                logger.warning("%s: dropped %d rows whose label differs from the stored row", name, report['conflicting_labels'])
+    finally:
+        for path, _ in files:
+            if os.path.exists(path):
+                os.remove(path)
+    with data_lock:
+        total_rows, buffer_rows = len(all_data), len(new_data_buffer)
+    buffer_rows_hist.observe(buffer_rows)
+    result = {"files": results, "rows_added": sum(r.get('rows_added', 0) for r in results),
+              "duplicates": sum(r.get('duplicates', 0) for r in results),
+              "conflicting_labels": sum(r.get('conflicting_labels', 0) for r in results), "total_rows": total_rows,
+              "buffer_rows": buffer_rows, "threshold": UPDATE_THRESHOLD, "retrain_job_id": None}
+    if retrain_due(buffer_rows):
+        result['retrain_job_id'] = schedule_retrain(buffer_rows)['id']
+        logger.info("Buffer threshold reached. Retraining in background (job %s)", result['retrain_job_id'])
+    return result
+
+# ===================== Prediction Helpers =====================
+HABITABLE_ZONE_LABELS = ["Too Cold", "Too Hot", "Outer Edge"]
+
+def build_prediction_results(df_features, probabilities):
+    """Build per-row prediction dicts from whole columns instead of a per-row loop"""
+    proba = np.asarray(probabilities, dtype=np.float64)
+    pred = proba.argmax(axis=1)
+    eq_temp = df_features['koi_teq'].to_numpy(dtype=np.float64)
+    planet_radius = df_features['koi_prad'].to_numpy(dtype=np.float64)
+
+    labels = np.array([REVERSE_LABEL_MAP[k] for k in range(proba.shape[1])], dtype=object)[pred].tolist()
+    confidence = np.round(proba[np.arange(len(pred)), pred] * 100, 1).tolist()
+    is_exoplanet = (pred > 0).tolist()
+    is_habitable = ((eq_temp >= 180) & (eq_temp <= 310) & (planet_radius >= 0.5) & (planet_radius <= 2.0)).tolist()
+    habitable_zone = np.select([eq_temp < 180, eq_temp > 310, eq_temp <= 245], HABITABLE_ZONE_LABELS, "Inner Edge").tolist()
+    proba_pct = np.round(proba * 100, 1)
+    false_positive, candidate, confirmed = proba_pct[:, 0].tolist(), proba_pct[:, 1].tolist(), proba_pct[:, 2].tolist()
+
+    return [
+        {"prediction_label": lbl, "confidence": conf, "is_exoplanet": exo, "is_habitable": hab, "habitable_zone": zone,
+         "probabilities": {"false_positive": fp, "candidate": cand, "confirmed": conf_p}}
+        for lbl, conf, exo, hab, zone, fp, cand, conf_p in zip(
+            labels, confidence, is_exoplanet, is_habitable, habitable_zone, false_positive, candidate, confirmed)
+    ]
+
+def score_rows_cached(engine, rows, endpoint, timings=None):
+    """Probabilities for raw feature rows, scoring only those not already in the prediction cache"""
+    rows_scored.observe(len(rows), endpoint)
+    # Bulk uploads gain little from the cache and would evict every /predict_manual entry
+    if prediction_cache.max_entries == 0 or len(rows) > PREDICTION_CACHE_MAX_ROWS:
+        return engine.predict_proba(rows, timings)
+    keys = row_keys(rows, engine.version)
+    probabilities = prediction_cache.get_many(keys)
+    missing = [i for i, proba in enumerate(probabilities) if proba is None]
+    cache_hit_ratio.observe(1 - len(missing) / len(rows) if len(rows) else 0.0, endpoint)
+    if missing:
+        fresh = [proba.copy() for proba in engine.predict_proba(rows[missing], timings)]
+        prediction_cache.put_many([keys[i] for i in missing], fresh)
+        for i, proba in zip(missing, fresh):
+            probabilities[i] = proba
+    return np.vstack(probabilities)
+
+def score_manual_rows(rows):
+    """Impute, scale and score stacked /predict_manual rows with a single booster call.
+
+    Each row's result is (probabilities, stage timings of the shared batch).
+    """
+    engine = inference_engine
+    if engine is None:
+        raise RuntimeError("Model not trained yet.")
+    timings = {}
+    probabilities = score_rows_cached(engine, rows, 'predict_manual', timings)
+    return [(proba, timings) for proba in probabilities]
+
+manual_batcher = MicroBatcher(score_manual_rows, MICROBATCH_MAX_SIZE, MICROBATCH_WAIT_MS)
+manual_latency = LatencyTracker()
+
+def score_batch(df, engine, trace=None):
+    """Score a raw uploaded frame and attach each row's original data to its result"""
+    if engine is None:
+        raise RuntimeError("Model not trained yet.")
+    timings = {}
+    start = time.perf_counter()
+    raw = df.reindex(columns=feature_columns).to_numpy(dtype=np.float64)
+    df_features = pd.DataFrame(np.where(np.isnan(raw), engine.medians, raw), columns=feature_columns, copy=False)
+    timings['impute'] = time.perf_counter() - start
+    # Label is the argmax of the probabilities, so a single booster pass covers both
+    probabilities = score_rows_cached(engine, raw, 'predict_batch', timings)
+    shadow_scorer.offer(raw, probabilities)
+    start = time.perf_counter()
+    results = build_prediction_results(df_features, probabilities)
+    for row, original in zip(results, df.to_dict(orient='records')):
+        row["original_data"] = original
+    timings['serialize'] = time.perf_counter() - start
+    if trace is not None:
+        trace.record_all(timings)
+    return results
+
+def stream_batch_ndjson(chunks, engine, trace):
+    """Yield newline-delimited JSON results one chunk at a time"""
+    total = 0
+    try:
+        while True:
+            with trace.stage('parse'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            results = score_batch(chunk, engine, trace)
+            total += len(results)
+            with trace.stage('serialize'):
+                payload = ''.join(app.json.dumps(row) + '\n' for row in results)
+            yield payload
+        logger.debug("Streamed batch prediction complete. Sent %d results.", total)
+    except Exception as e:
+        logger.error("Streamed batch prediction error after %d rows: %s", total, e)
+        yield app.json.dumps({"error": str(e), "rows_sent": total}) + '\n'
+
+def conditional_json(payload):
+    """JSON response with an ETag, answered with 304 when it matches If-None-Match"""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
 # ===================== API Endpoints =====================
+@app.before_request
+def start_trace():
+    g.trace = RequestTrace(request.endpoint or 'unknown', stage_seconds)
+
+@app.after_request
+def finish_trace(response):
+    """Record request latency and expose the stage timings as a Server-Timing header"""
+    trace = g.get('trace')
+    if trace is not None:
+        elapsed = trace.elapsed()
+        request_seconds.observe(elapsed, trace.endpoint, str(response.status_code))
+        if trace.stages:
+            response.headers['Server-Timing'] = trace.server_timing()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s %d %.3fms stages=%s", request.method, request.path, response.status_code, elapsed * 1000, trace.server_timing())
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 
 @app.route('/predict_manual', methods=['POST'])
 def predict_manual():
     """Predict from manual user input"""
     if model is None or scaler is None: return jsonify({"error": "Model not trained yet."}), 400
+    start = time.perf_counter()
+    trace = g.trace
     try:
-        data = request.json
-        validation_errors = validate_manual_input(data)
-        if validation_errors: return jsonify({"error": "Validation failed", "details": validation_errors}), 400
-        transformed_data = {col: float(data[col]) for col in feature_columns if col in data and data[col] != ''}
-        df = pd.DataFrame([transformed_data])
-        X_new = df.reindex(columns=feature_columns).fillna(all_data[feature_columns].median() if len(all_data) > 0 else 0).astype(float)
-        X_scaled = scaler.transform(X_new)
-        pred = model.predict(X_scaled)[0]
-        proba = model.predict_proba(X_scaled)[0]
+        with trace.stage('parse'):
+            data = request.json
+        with trace.stage('validate'):
+            validation_errors = validate_manual_input(data)
+            if validation_errors: return jsonify({"error": "Validation failed", "details": validation_errors}), 400
+            transformed_data = {col: float(data[col]) for col in feature_columns if col in data and data[col] != ''}
+            row = np.array([transformed_data.get(col, np.nan) for col in feature_columns], dtype=float)
+        # Concurrent requests are scored together; the label is the argmax of the probabilities
+        queued = time.perf_counter()
+        proba, batch_timings = manual_batcher.submit(row).result(timeout=30)
+        trace.record_all(batch_timings)
+        # Time spent waiting for the micro-batch to form and for earlier batches to finish
+        trace.record('queue', max(0.0, time.perf_counter() - queued - sum(batch_timings.values())))
+        shadow_scorer.offer(row, proba)
+        serialize_start = time.perf_counter()
+        pred = int(np.argmax(proba))
         prediction_label = REVERSE_LABEL_MAP.get(int(pred), 'UNKNOWN')
         confidence = float(proba[int(pred)] * 100)
         eq_temp = transformed_data.get('koi_teq', 0); planet_radius = transformed_data.get('koi_prad', 0)
@@ -274,9 +981,12 @@ def predict_manual():
         "probabilities": {"false_positive": round(float(proba[0]) * 100, 1), "candidate": round(float(proba[1]) * 100, 1), "confirmed": round(float(proba[2]) * 100, 1)}
         }
 
-        return jsonify(result)
+        response = jsonify(result)
+        trace.record('serialize', time.perf_counter() - serialize_start)
+        manual_latency.record(time.perf_counter() - start)
+        return response
     except Exception as e:
-        print(f"✖ Prediction error: {str(e)}"); return jsonify({"error": str(e)}), 400
+        logger.error("Prediction error: %s", e); return jsonify({"error": str(e)}), 400
 
 @app.route('/predict_batch', methods=['POST'])
 def predict_batch():
@@ -286,95 +996,168 @@ def predict_batch():
     file = request.files['file']
     if file.filename == '': return jsonify({"error": "No file selected"}), 400
     try:
-        df = pd.read_csv(file)
-        print(f"✔ Received batch prediction request: {len(df)} rows")
-        original_df = df.copy()
-        existing_features = [col for col in feature_columns if col in df.columns]
-        if not existing_features: return jsonify({"error": "CSV must contain at least one valid feature column."}), 400
-        
-        df_features = df[existing_features].reindex(columns=feature_columns).fillna(
-            all_data[feature_columns].median() if len(all_data) > 0 else 0).astype(float)
-        
-        X_scaled = scaler.transform(df_features)
-        predictions = model.predict(X_scaled)
-        probabilities = model.predict_proba(X_scaled)
-
-        results = []
-        for i in range(len(df)):
-            pred = predictions[i]; proba = probabilities[i]
-            prediction_label = REVERSE_LABEL_MAP.get(int(pred), 'UNKNOWN')
-            confidence = float(proba[int(pred)] * 100)
-            eq_temp = df_features.iloc[i].get('koi_teq', 0); planet_radius = df_features.iloc[i].get('koi_prad', 0)
-            is_habitable = (180 <= eq_temp <= 310) and (0.5 <= planet_radius <= 2.0)
-            habitable_zone = "Too Cold" if eq_temp < 180 else "Too Hot" if eq_temp > 310 else "Outer Edge" if 180 <= eq_temp <= 245 else "Inner Edge"
-            results.append({
-                "original_data": original_df.iloc[i].to_dict(), "prediction_label": prediction_label,
-                "confidence": round(confidence, 1), "is_exoplanet": bool(int(pred) > 0), "is_habitable": bool(is_habitable),
-                "habitable_zone": habitable_zone,
-                "probabilities": {"false_positive": round(float(proba[0])*100,1), "candidate": round(float(proba[1])*100,1), "confirmed": round(float(proba[2])*100,1)}
-            })
-        print(f"✔ Batch prediction complete. Returning {len(results)} results.")
-        return jsonify(results)
+        engine = inference_engine
+        trace = g.trace
+        if request.args.get('stream') == 'ndjson':
+            with trace.stage('parse'):
+                chunks = pd.read_csv(file, chunksize=BATCH_CHUNK_ROWS)
+                first = next(chunks, None)
+            with trace.stage('validate'):
+                if first is None or not any(col in first.columns for col in feature_columns):
+                    return jsonify({"error": "CSV must contain at least one valid feature column."}), 400
+            logger.debug("Received streaming batch prediction request (%d rows per chunk)", BATCH_CHUNK_ROWS)
+            return Response(stream_with_context(stream_batch_ndjson(itertools.chain([first], chunks), engine, trace)),
+                            mimetype='application/x-ndjson')
+
+        with trace.stage('parse'):
+            df = pd.read_csv(file)
+        logger.debug("Received batch prediction request: %d rows", len(df))
+        with trace.stage('validate'):
+            if not any(col in df.columns for col in feature_columns):
+                return jsonify({"error": "CSV must contain at least one valid feature column."}), 400
+
+        results = score_batch(df, engine, trace)
+        logger.debug("Batch prediction complete. Returning %d results.", len(results))
+        with trace.stage('serialize'):
+            return jsonify(results)
     except Exception as e:
-        print(f"✖ Batch prediction error: {str(e)}"); return jsonify({"error": str(e)}), 500
+        logger.error("Batch prediction error: %s", e); return jsonify({"error": str(e)}), 500
 
 @app.route('/update_model', methods=['POST'])
 def update_model():
     """Update dataset with new labeled CSV and retrain if threshold reached."""
-    global all_data, new_data_buffer
     if 'file' not in request.files: return jsonify({"error": "No CSV file uploaded"}), 400
     file = request.files['file']
     if file.filename == '': return jsonify({"error": "No file selected"}), 400
     try:
-        print(f"📁 Processing uploaded file: {file.filename}")
-        df = pd.read_csv(file)
-        print(f"📊 Loaded CSV: {len(df)} rows, {len(df.columns)} columns")
-        
+        logger.debug("Processing uploaded file: %s", file.filename)
+        ensure_training_data()
+        trace = g.trace
+        with trace.stage('parse'):
+            df = read_koi_csv(file, feature_columns)
+        logger.debug("Loaded CSV: %d rows, %d schema columns", len(df), len(df.columns))
+        with trace.stage('validate'):
+            errors = validate_csv_structure(df)
+            if errors: return jsonify({"error": "Invalid CSV structure", "details": errors}), 400
+            df_processed, report = clean_koi_frame(df, feature_columns, LABEL_MAP)
+        if report['rows_accepted'] < report['rows_read']:
+            logger.warning("Rejected %d of %d uploaded rows: %s", report['rows_read'] - report['rows_accepted'], report['rows_read'], report['rejected'])
 
-        
+        # ✅ Append-only: only the new rows are written, then picked up (with any other worker's) from the store
+        with trace.stage('persist'):
+            data_store.append(df_processed)
+            sync_training_data()
+        with data_lock:
+            total_rows, buffer_rows = len(all_data), len(new_data_buffer)
+        buffer_rows_hist.observe(buffer_rows)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Uploaded columns: %s\nSample rows:\n%s", list(df_processed.columns), df_processed.head().to_string())
+        logger.info("Added %d rows. Buffer: %d rows", len(df_processed), buffer_rows)
 
-        df_processed = df
+        response_data = {"status": "data_added", "rows_added": len(df_processed), "rows_rejected": report['rejected'], "total_rows": total_rows, "buffer_rows": buffer_rows, "threshold": UPDATE_THRESHOLD}
 
-        
-        new_data_buffer = pd.concat([new_data_buffer, df_processed], ignore_index=True)
-        # ✅ Append processed data
-        all_data = pd.concat([all_data, df_processed], ignore_index=True)
+        retrain = retrain_due(buffer_rows)
+        if retrain:
+            # Training runs on the background worker; the new model is swapped in when it finishes
+            job = schedule_retrain(buffer_rows)
+            logger.info("Buffer threshold reached. Retraining in background (job %s)", job['id'])
+            response_data.update({"status": "retrain_scheduled", "job_id": job['id']})
+        return jsonify(response_data), 202 if retrain else 200
+    except Exception as e:
+        logger.error("Update error: %s", e); return jsonify({"error": str(e)}), 400
 
-        # 🧠 Debug: check structure before saving
-        print("\n💾 Preparing to save all_data...")
-        print("📋 Columns:", list(all_data.columns))
-        print("📊 Sample rows:\n", all_data.head().to_string())
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    """Queue labeled CSVs (several files, optionally gzip-compressed) for de-duplicated ingestion"""
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not files: return jsonify({"error": "No CSV file uploaded"}), 400
+    # Spooled to disk, since uploads are only readable until the request returns
+    with g.trace.stage('persist'):
+        os.makedirs(INGEST_DIR, exist_ok=True)
+        batch = uuid.uuid4().hex
+        spooled = []
+        for i, file in enumerate(files):
+            path = os.path.join(INGEST_DIR, f"{batch}-{i}{ingest_suffix(file.filename)}")
+            file.save(path)
+            spooled.append((path, file.filename))
+    job = submit_job('ingest', ingest_job, spooled, executor=ingest_executor)
+    return jsonify({"status": "ingest_scheduled", "job_id": job['id'], "files": len(spooled)}), 202
 
-        # ✅ Always save with headers
-        all_data.to_csv(DATA_CSV, index=False, header=True)
-        print(f"✔ Added {len(df_processed)} rows. Buffer: {len(new_data_buffer)} rows\n")
+@app.route('/ready', methods=['GET'])
+def get_ready():
+    """Report warm-up progress; 200 once predictions can be served, 503 before"""
+    with warmup_lock:
+        state = {'stages': dict(warmup_state['stages']), 'ready_seconds': warmup_state['ready_seconds'],
+                 'uptime_seconds': round(time.perf_counter() - warmup_state['started_at'], 3)}
+    state['ready'] = state['stages'].get('model') == 'ready'
+    return jsonify(state), 200 if state['ready'] else 503
 
-        
-        response_data = {"status": "data_added", "rows_added": len(df_processed), "total_rows": len(all_data), "buffer_rows": len(new_data_buffer), "threshold": UPDATE_THRESHOLD}
-        
-        if len(new_data_buffer) >= UPDATE_THRESHOLD:
-            print(f"✔ Buffer threshold reached. Retraining model...")
-            acc = retrain_model()
-            if acc is not None:
-                new_data_buffer = pd.DataFrame(columns=feature_columns + ['label'])
-                response_data.update({"status": "model_retrained", "training_accuracy": round(acc, 4), "buffer_rows": 0, "metrics": current_metrics})
-            else:
-                response_data["status"] = "data_added_retrain_failed"
-        return jsonify(response_data), 200
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Get the status of a background job"""
+    job = get_job(job_id)
+    if job is None: return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    return jsonify(job)
+
+@app.route('/models', methods=['GET'])
+def get_models():
+    """List registered model versions, the production history and shadow scoring results"""
+    registry = model_registry.summary()
+    registry.update(serving_version=model_version, last_candidate=last_candidate, shadow=shadow_scorer.stats())
+    return conditional_json(registry)
+
+@app.route('/models/<version>/promote', methods=['POST'])
+def promote_model(version):
+    """Make a registered version the production model, bypassing the accuracy gate (used for rollback)"""
+    if not model_registry.has(version): return jsonify({"error": f"Unknown model version '{version}'"}), 404
+    try:
+        new_model, new_scaler, new_medians, metrics = model_registry.load(version)
+        publish_model(new_model, new_scaler, new_medians.reindex(feature_columns).fillna(0.0), version, metrics, "manual promotion")
+        logger.info("Promoted model %s to production", version)
+        return jsonify({"status": "promoted", "model_version": version})
+    except Exception as e:
+        logger.error("Promotion error: %s", e); return jsonify({"error": str(e)}), 500
+
+@app.route('/models/<version>/shadow', methods=['POST'])
+def shadow_model(version):
+    """Score a sample of live predict traffic with a registered version alongside production"""
+    if not model_registry.has(version): return jsonify({"error": f"Unknown model version '{version}'"}), 404
+    try:
+        new_model, new_scaler, new_medians, _ = model_registry.load(version)
+        shadow_scorer.start(build_inference_engine(new_model, new_scaler, new_medians.reindex(feature_columns).fillna(0.0), version))
+        return jsonify({"status": "shadowing", "shadow": shadow_scorer.stats()})
     except Exception as e:
-        print(f"✖ Update error: {str(e)}"); return jsonify({"error": str(e)}), 400
+        logger.error("Shadow error: %s", e); return jsonify({"error": str(e)}), 500
+
+@app.route('/models/shadow', methods=['DELETE'])
+def stop_shadow():
+    """Stop shadow scoring and return its final comparison"""
+    stats = shadow_scorer.stats()
+    shadow_scorer.stop()
+    return jsonify({"status": "stopped", "shadow": stats})
 
 @app.route('/stats', methods=['GET'])
 def get_stats():
     """Get comprehensive system statistics"""
+    ensure_training_data()
     stats = {
         "total_data_rows": len(all_data), "buffer_rows": len(new_data_buffer), "threshold": UPDATE_THRESHOLD,
-        "model_exists": os.path.exists(MODEL_PATH), "feature_count": len(feature_columns)
+        "retrain_at_buffer_rows": retrain_hold_rows + UPDATE_THRESHOLD, "model_exists": os.path.exists(MODEL_PATH), "feature_count": len(feature_columns), "model_version": model_version
     }
-    if len(all_data) > 0 and 'label' in all_data.columns:
-        label_dist = all_data['label'].value_counts().to_dict()
-        stats["label_distribution"] = {"FALSE_POSITIVE": label_dist.get(0, 0), "CANDIDATE": label_dist.get(1, 0), "CONFIRMED": label_dist.get(2, 0)}
-    return jsonify(stats)
+    if len(all_data) > 0:
+        # Maintained incrementally by update_model instead of a value_counts() over all_data per poll
+        stats["label_distribution"] = {"FALSE_POSITIVE": label_counts.get(0, 0), "CANDIDATE": label_counts.get(1, 0), "CONFIRMED": label_counts.get(2, 0)}
+    # Only fields that change with the data or the model, so polls between uploads get a 304
+    return conditional_json(stats)
+
+@app.route('/stats/runtime', methods=['GET'])
+def get_runtime_stats():
+    """Serving counters that change with every request, kept out of the ETagged /stats"""
+    return jsonify({
+        "predict_manual": {"latency": manual_latency.summary(), "micro_batching": manual_batcher.stats()},
+        "prediction_cache": prediction_cache.stats(),
+        "ingest": dict(ingest_totals, index=dedup_index.stats())
+    })
 
 @app.route('/accuracy', methods=['GET'])
 def get_accuracy():
@@ -386,28 +1169,36 @@ def get_accuracy():
     # Return the accuracy stored in current_metrics (from retrain_model)
     accuracy = current_metrics.get('accuracy')
     if accuracy is not None:
-        print(f"✔ Returning stored accuracy: {accuracy}")
+        logger.debug("Returning stored accuracy: %s", accuracy)
         return jsonify({"accuracy": accuracy})
     else:
-        print("⚠ No accuracy data available")
+        logger.debug("No accuracy data available")
         return jsonify({"accuracy": None})
 
 @app.route('/test_accuracy', methods=['GET'])
 def get_test_accuracy():
     """Get model accuracy on test dataset"""
-    global test_data, current_metrics
-    if model is None or len(test_data) == 0: 
+    global current_metrics
+    if model is None or len(ensure_test_data()) == 0: 
         return jsonify({"test_accuracy": None, "message": "No test data available"})
+    if inference_engine is None:
+        return jsonify({"test_accuracy": None, "message": "Model not trained yet"})
     
     try:
-        X = test_data[feature_columns].astype(float)
-        y = test_data['label'].values.astype(int)
-        test_acc = accuracy_score(y, model.predict(scaler.transform(X)))
-        
-        print(f"✔ Test accuracy calculated: {test_acc:.4f}")
-        return jsonify({"test_accuracy": round(test_acc, 4), "test_samples": len(test_data)})
+        with model_lock:
+            metrics = current_metrics
+        if 'test_accuracy' not in metrics:
+            # Computed once per model version (normally during retrain_model) and kept in metrics.json
+            test_model, test_scaler, _ = serving_snapshot()
+            result = evaluate_test_accuracy(test_model, test_scaler)
+            with model_lock:
+                if metrics is current_metrics:
+                    current_metrics.update(result)
+                    save_metrics(current_metrics)
+            metrics = dict(metrics, **result)
+        return conditional_json({"test_accuracy": metrics['test_accuracy'], "test_samples": metrics['test_samples']})
     except Exception as e:
-        print(f"✖ Test accuracy calculation error: {str(e)}")
+        logger.error("Test accuracy calculation error: %s", e)
         return jsonify({"test_accuracy": None, "error": str(e)})
 
 @app.route('/csv_template', methods=['GET'])
@@ -448,11 +1239,7 @@ def get_csv_template():
 
 # ===================== Main =====================
 if __name__ == '__main__':
-    print("=" * 60)
-    print("🚀 Exoplanet Detection API Starting...")
-    print("=" * 60)
+    logger.info("Exoplanet Detection API starting...")
     initialize_system()
-    print("=" * 60)
-    print("✔ System ready!")
-    print("=" * 60)
+    logger.info("System ready")
     app.run(debug=True, host='0.0.0.0', port=5000)
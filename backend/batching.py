@@ -0,0 +1,93 @@
+"""Server-side micro-batching for single-row predictions."""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collects concurrent single-row requests for up to max_wait_ms and scores them in one call.
+
+    score_fn receives a 2D array with one row per request and returns one result row per input row.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, row):
+        """Queue one feature row and return a Future for its result"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='sarmad-microbatch', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            futures = [future for _, future in batch]
+            try:
+                results = self.score_fn(np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def stats(self):
+        return {'max_batch_size': self.max_batch_size, 'max_wait_ms': self.max_wait * 1000.0, 'batches': self.batches,
+                'rows': self.rows, 'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else None}
+
+
+class LatencyTracker:
+    """Rolling window of request latencies with percentile summaries"""
+
+    def __init__(self, window=2048):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds * 1000.0)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples)
+            count = self.count
+        if len(samples) == 0:
+            return {'count': count, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(samples, [50, 99])
+        return {'count': count, 'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
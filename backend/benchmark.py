@@ -0,0 +1,394 @@
+"""Reproducible benchmark suite for the backend hot paths.
+
+Each case runs in a fresh subprocess inside a scratch directory, on synthetic KOI data generated from
+fixed seeds, so peak RSS is per case and nothing touches the real artifacts. Results can be saved as a
+JSON baseline; later runs compared against it exit non-zero when a case regresses past --threshold.
+
+Usage:
+    python benchmark.py                                  # full suite, 1k to 1M rows
+    python benchmark.py --sizes 1000 10000 --cases predict_batch score_batch
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.25
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+import app as backend
+from cache import PredictionCache
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_THRESHOLD = 0.2  # Allowed relative slowdown (throughput, p99) or growth (peak RSS) before failing
+MANUAL_REQUESTS = 2000  # Requests timed by the unsized single-row cases
+SEED = 42
+
+
+# ===================== Synthetic Data =====================
+def make_koi_frame(n_rows, seed=SEED, with_label=True):
+    """Generate a synthetic KOI frame with the 16 feature columns"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'koi_fpflag_nt': rng.integers(0, 2, n_rows), 'koi_fpflag_ss': rng.integers(0, 2, n_rows),
+        'koi_fpflag_co': rng.integers(0, 2, n_rows), 'koi_fpflag_ec': rng.integers(0, 2, n_rows),
+        'koi_period': rng.lognormal(2.5, 1.2, n_rows), 'koi_impact': rng.uniform(0, 1.2, n_rows),
+        'koi_duration': rng.lognormal(1.2, 0.5, n_rows), 'koi_depth': rng.lognormal(6, 1.5, n_rows),
+        'koi_prad': rng.lognormal(0.8, 0.9, n_rows), 'koi_teq': rng.uniform(100, 2500, n_rows),
+        'koi_insol': rng.lognormal(4, 2, n_rows), 'koi_model_snr': rng.lognormal(3, 1, n_rows),
+        'koi_steff': rng.normal(5600, 700, n_rows), 'koi_slogg': rng.normal(4.4, 0.3, n_rows),
+        'koi_srad': rng.lognormal(0, 0.4, n_rows), 'koi_kepmag': rng.normal(14.5, 1.3, n_rows),
+    })
+    if with_label:
+        flags = df[['koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec']].sum(axis=1)
+        df['label'] = np.where(flags > 0, 0, np.where(df['koi_model_snr'] > 20, 2, 1))
+    return df
+
+
+def setup_backend(n_train=2000, seed=SEED):
+    """Fit a small model directly on the app globals; the prediction cache is off unless a case enables it"""
+    train = make_koi_frame(n_train, seed)
+    backend.all_data = train
+    backend.prediction_cache = PredictionCache(0)
+    scaler = StandardScaler()
+    model = XGBClassifier(objective='multi:softmax', num_class=3, eval_metric='mlogloss', random_state=seed, n_estimators=100, max_depth=5)
+    model.fit(scaler.fit_transform(train[backend.feature_columns].astype(float)), train['label'].values)
+    backend.swap_model(model, scaler, backend.compute_feature_medians(train), 'benchmark', {})
+    backend.warmup_state['stages'] = {'model': 'ready', 'test_data': 'ready', 'training_data': 'ready'}
+
+
+def enable_cache():
+    """Serve from a prediction cache of the default size, as the app does unless configured otherwise"""
+    backend.prediction_cache = PredictionCache(backend.PREDICTION_CACHE_SIZE)
+
+
+def post_csv(client, path, df):
+    csv_bytes = df.to_csv(index=False).encode()
+    return lambda: client.post(path, data={'file': (io.BytesIO(csv_bytes), 'bench.csv')}, content_type='multipart/form-data')
+
+
+# ===================== Cases =====================
+# Each case takes a row count and returns (operation, rows per call[, reset]). The harness calls
+# operation repeatedly and records one latency sample per call; reset, if given, runs untimed before each.
+def case_predict_manual(n_rows):
+    """POST /predict_manual, one row per request"""
+    client = backend.app.test_client()
+    rows = make_koi_frame(MANUAL_REQUESTS, seed=11, with_label=False).to_dict(orient='records')
+    requests = iter(rows * 2)
+    def op():
+        resp = client.post('/predict_manual', json=next(requests))
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return op, 1
+
+
+def case_predict_manual_cache_cold(n_rows):
+    """POST /predict_manual with the prediction cache on, every row new to it"""
+    enable_cache()
+    return case_predict_manual(n_rows)
+
+
+def case_predict_manual_cache_warm(n_rows):
+    """POST /predict_manual with the prediction cache on, every row already cached"""
+    enable_cache()
+    op, rows_per_call = case_predict_manual(n_rows)
+    rows = make_koi_frame(MANUAL_REQUESTS, seed=11, with_label=False)[backend.feature_columns].to_numpy(dtype=float)
+    for start in range(0, len(rows), backend.MICROBATCH_MAX_SIZE):
+        backend.score_manual_rows(rows[start:start + backend.MICROBATCH_MAX_SIZE])
+    return op, rows_per_call
+
+
+def case_score_manual_rows(n_rows):
+    """score_manual_rows on a single row, the function behind each micro-batch"""
+    rows = make_koi_frame(MANUAL_REQUESTS, seed=11, with_label=False)[backend.feature_columns].to_numpy(dtype=float)
+    rows[::5, 7] = np.nan  # Exercise imputation
+    requests = iter(np.vstack([rows, rows]))
+    return (lambda: backend.score_manual_rows(next(requests)[None, :])), 1
+
+
+def case_predict_batch(n_rows):
+    """POST /predict_batch with a JSON response"""
+    client = backend.app.test_client()
+    post = post_csv(client, '/predict_batch', make_koi_frame(n_rows, seed=7, with_label=False))
+    def op():
+        resp = post()
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return op, n_rows
+
+
+def case_predict_batch_cache_cold(n_rows):
+    """POST /predict_batch with the prediction cache on and emptied before each call"""
+    enable_cache()
+    op, rows_per_call = case_predict_batch(n_rows)
+    return op, rows_per_call, backend.prediction_cache.clear
+
+
+def case_predict_batch_cache_warm(n_rows):
+    """POST /predict_batch with the prediction cache on, repeating the same upload"""
+    enable_cache()
+    op, rows_per_call = case_predict_batch(n_rows)
+    op()
+    return op, rows_per_call
+
+
+def case_predict_batch_stream(n_rows):
+    """POST /predict_batch?stream=ndjson, consuming the whole stream"""
+    client = backend.app.test_client()
+    post = post_csv(client, '/predict_batch?stream=ndjson', make_koi_frame(n_rows, seed=7, with_label=False))
+    def op():
+        resp = post()
+        assert resp.status_code == 200 and resp.get_data().count(b'\n') == n_rows
+    return op, n_rows
+
+
+def case_score_batch(n_rows):
+    """score_batch on an already parsed frame"""
+    df = make_koi_frame(n_rows, seed=7, with_label=False)
+    return (lambda: backend.score_batch(df, backend.inference_engine)), n_rows
+
+
+def case_update_model(n_rows):
+    """POST /update_model with labelled rows, retraining disabled"""
+    backend.UPDATE_THRESHOLD = sys.maxsize
+    client = backend.app.test_client()
+    post = post_csv(client, '/update_model', make_koi_frame(n_rows, seed=13))
+    def op():
+        resp = post()
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+    return op, n_rows
+
+
+def case_data_store_append(n_rows):
+    """PartitionStore.append of one upload"""
+    df = make_koi_frame(n_rows, seed=13).reindex(columns=backend.feature_columns + ['label'])
+    return (lambda: backend.data_store.append(df)), n_rows
+
+
+def prepare_retrain(n_rows):
+    backend.all_data = make_koi_frame(n_rows, seed=17)
+    backend.test_data = make_koi_frame(1000, seed=19)
+
+
+def case_retrain_full(n_rows):
+    """retrain_model full refit (fit, evaluation, registry and artifact writes) on n_rows"""
+    prepare_retrain(n_rows)
+    def op():
+        assert backend.retrain_model() is not None
+    return op, n_rows
+
+
+def case_retrain_incremental(n_rows):
+    """retrain_model continuing the serving booster on n_rows new rows"""
+    prepare_retrain(n_rows)
+    new_rows = make_koi_frame(n_rows, seed=23)
+    backend.all_data = pd.concat([backend.all_data, new_rows], ignore_index=True)
+    base, version = backend.serving_snapshot(), backend.model_version
+    def reset():
+        # Every call continues the same setup_backend booster: a promoted model would otherwise
+        # grow by INCREMENTAL_TREES per call, and FULL_REBUILD_EVERY would force a full refit
+        backend.swap_model(*base, version, {'training': {'incremental_rounds': 0}})
+    def op():
+        assert backend.retrain_model(new_rows) is not None
+    return op, n_rows, reset
+
+
+CASES = {
+    'predict_manual': (case_predict_manual, False), 'score_manual_rows': (case_score_manual_rows, False),
+    'predict_manual_cache_cold': (case_predict_manual_cache_cold, False),
+    'predict_manual_cache_warm': (case_predict_manual_cache_warm, False),
+    'predict_batch': (case_predict_batch, True), 'predict_batch_stream': (case_predict_batch_stream, True),
+    'predict_batch_cache_cold': (case_predict_batch_cache_cold, True),
+    'predict_batch_cache_warm': (case_predict_batch_cache_warm, True),
+    'score_batch': (case_score_batch, True), 'update_model': (case_update_model, True),
+    'data_store_append': (case_data_store_append, True), 'retrain_full': (case_retrain_full, True),
+    'retrain_incremental': (case_retrain_incremental, True),
+}
+
+
+def repeats_for(n_rows, sized):
+    """More samples for cheap calls, at least one for the largest sizes"""
+    return MANUAL_REQUESTS if not sized else max(1, min(50, 200000 // n_rows))
+
+
+def run_case(name, n_rows):
+    """Run one case in this process and return its measurements"""
+    setup_backend()
+    factory, sized = CASES[name]
+    # Warm-up call on a small input so one-off import and allocation costs are not timed. It runs
+    # first because some cases set up app state (all_data) for the call that follows.
+    factory(min(n_rows, 1000) if sized else n_rows)[0]()
+    op, rows_per_call, *reset = factory(n_rows)
+    timings = []
+    for _ in range(repeats_for(n_rows, sized)):
+        for fn in reset:
+            fn()
+        start = time.perf_counter()
+        op()
+        timings.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {'case': name, 'rows': n_rows if sized else rows_per_call, 'calls': len(timings),
+            'rows_per_sec': round(rows_per_call / float(np.median(timings)), 1),
+            'p50_ms': round(float(p50) * 1000, 3), 'p99_ms': round(float(p99) * 1000, 3), 'peak_rss_mb': backend.peak_rss_mb()}
+
+
+def run_case_subprocess(name, n_rows):
+    """Run one case in a fresh interpreter with a scratch working directory"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=backend_dir, SARMAD_LAZY_DATA_LOADING='1')
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run([sys.executable, os.path.join(backend_dir, 'benchmark.py'), '--run-case', name, '--rows', str(n_rows)],
+                             cwd=workdir, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{name}@{n_rows} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_single_row(n_requests=MANUAL_REQUESTS):
+    """Per-row latency of the pandas/sklearn path versus the InferenceEngine path, asserting identical output"""
+    setup_backend()
+    df = make_koi_frame(n_requests, seed=11, with_label=False)
+    df.loc[::5, 'koi_depth'] = np.nan
+    rows = df[backend.feature_columns].to_numpy(dtype=float)
+    model, scaler, medians = backend.serving_snapshot()
+    engine = backend.inference_engine
+    timings = {'pandas': [], 'engine': []}
+    for row in rows:
+        start = time.perf_counter()
+        X = pd.DataFrame([row], columns=backend.feature_columns).fillna(medians).astype(float)
+        expected = model.predict_proba(scaler.transform(X))
+        timings['pandas'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        got = engine.predict_proba(row)
+        timings['engine'].append(time.perf_counter() - start)
+        assert np.array_equal(expected, got), (expected, got)
+    return {path: {'p50_us': round(float(np.percentile(t, 50)) * 1e6, 1), 'p99_us': round(float(np.percentile(t, 99)) * 1e6, 1)}
+            for path, t in timings.items()}
+
+
+# ===================== Cold Start =====================
+COLD_START_TARGET_SECONDS = 0.5  # initialize_system() through the first /predict_manual response
+
+COLD_START_SCRIPT = """
+import time; t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.initialize_system()
+resp = app.app.test_client().post('/predict_manual', json={col: 1 for col in app.feature_columns})
+t2 = time.perf_counter()
+assert resp.status_code == 200, resp.get_data(as_text=True)
+print(round(t1 - t0, 4), round(t2 - t1, 4))
+"""
+
+
+def bench_cold_start(n_rows=50000):
+    """Time-to-first-prediction of a fresh process against saved artifacts and a n_rows training history"""
+    setup_backend()
+    cwd = os.getcwd()
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            model, scaler, medians = backend.serving_snapshot()
+            backend.save_native_model(model, backend.MODEL_NATIVE_PATH)
+            backend.atomic_dump(scaler, backend.SCALER_PATH)
+            backend.save_feature_medians(medians, 'benchmark')
+            backend.save_metrics({'model_version': 'benchmark'})
+            # DATA_STORE_DIR is relative, so this writes into workdir
+            backend.data_store.append(make_koi_frame(n_rows, seed=3))
+        finally:
+            os.chdir(cwd)
+        env = dict(os.environ, PYTHONPATH=backend_dir)
+        out = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    import_seconds, first_prediction_seconds = map(float, out.stdout.strip().splitlines()[-1].split())
+    return {'import_seconds': import_seconds, 'first_prediction_seconds': first_prediction_seconds,
+            'target_seconds': COLD_START_TARGET_SECONDS, 'met_target': first_prediction_seconds <= COLD_START_TARGET_SECONDS}
+
+
+# ===================== Baselines =====================
+def environment():
+    """Library versions and host details the numbers depend on"""
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'xgboost': xgboost.__version__, 'sklearn': sklearn.__version__,
+            'tree_method': backend.TRAIN_TREE_METHOD, 'n_jobs': backend.TRAIN_N_JOBS}
+
+
+def find_regressions(results, baseline, threshold):
+    """Cases whose throughput, p99 latency or peak RSS moved past threshold relative to baseline"""
+    previous = {f"{r['case']}@{r['rows']}": r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = previous.get(f"{result['case']}@{result['rows']}")
+        if base is None:
+            print(f"  {result['case']}@{result['rows']} has no baseline entry, not compared")
+            continue
+        checks = [('rows_per_sec', result['rows_per_sec'] < base['rows_per_sec'] * (1 - threshold)),
+                  ('p99_ms', result['p99_ms'] > base['p99_ms'] * (1 + threshold)),
+                  ('peak_rss_mb', None not in (result['peak_rss_mb'], base['peak_rss_mb']) and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold))]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{result['case']}@{result['rows']} {metric}: {base[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Row counts for the sized cases")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--baseline', help="Baseline JSON to compare against; exit 1 on regression")
+    parser.add_argument('--save-baseline', help="Write the results to this JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--skip-cold-start', action='store_true')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.rows)))
+        return 0
+
+    results = []
+    for name in args.cases:
+        for n_rows in (args.sizes if CASES[name][1] else [1]):
+            result = run_case_subprocess(name, n_rows)
+            print(f"{name:>22} {result['rows']:>9} rows  {result['rows_per_sec']:>12} rows/s  "
+                  f"p50 {result['p50_ms']:>10} ms  p99 {result['p99_ms']:>10} ms  peak {result['peak_rss_mb']} MB")
+            results.append(result)
+    report = {'environment': environment(), 'results': results, 'single_row': bench_single_row()}
+    print(f"single_row: {report['single_row']}")
+    if not args.skip_cold_start:
+        report['cold_start'] = bench_cold_start()
+        print(f"cold_start: {report['cold_start']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        # Library upgrades are what the baseline exists to catch; host changes make the numbers incomparable
+        for key, value in report['environment'].items():
+            if baseline['environment'].get(key) != value:
+                print(f"  environment {key}: {baseline['environment'].get(key)} -> {value}")
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
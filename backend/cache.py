@@ -0,0 +1,69 @@
+"""In-process LRU cache of prediction probabilities keyed by feature-vector content."""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+KEY_MULTIPLIER = np.uint64(1000003)  # Odd, so folding in a column never discards earlier bits
+
+
+def row_keys(rows, version):
+    """64-bit content hash of each raw feature row (NaN = missing) combined with the model version.
+
+    Values are hashed in one vectorised call and combined column by column, so the cost per row is a
+    few numpy operations and the fixed cost stays small enough for single-row requests.
+    """
+    rows = np.asarray(rows, dtype=np.float64).reshape(len(rows), -1)
+    # Canonicalise NaN payloads and -0.0 so equal vectors always hash the same
+    rows = np.where(np.isnan(rows), np.nan, rows) + 0.0
+    hashes = pd.util.hash_array(rows.ravel()).reshape(rows.shape)
+    keys = np.full(len(rows), hash(str(version)) & 0xFFFFFFFFFFFFFFFF, dtype=np.uint64)  # The cache is per process
+    for column in hashes.T:
+        keys = keys * KEY_MULTIPLIER ^ column
+    return keys.tolist()
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping of row keys to probability vectors"""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """Cached values for keys, with None for each miss"""
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def put_many(self, keys, values):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                    'entries': len(self._entries), 'max_entries': self.max_entries}
@@ -0,0 +1,151 @@
+"""Append-only columnar storage for the training data.
+
+Each append writes one immutable column-major float64 .npy partition and then
+atomically replaces manifest.json, which lists the partitions in order. Writers
+in different processes are serialised with an flock on the store directory.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; cross-process locking is skipped there
+    fcntl = None
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".lock"
+
+
+@contextmanager
+def file_lock(path, exclusive=True, blocking=True):
+    """flock-based inter-process lock on path; yields False if non-blocking acquisition failed"""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, 'a') as f:
+        flags = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class PartitionStore:
+    """Directory of append-only column-major partitions with a fixed column schema"""
+
+    def __init__(self, root, columns):
+        self.root = root
+        self.columns = list(columns)
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+
+    @contextmanager
+    def lock(self):
+        """Exclusive writer lock across threads and processes; re-entrant within a thread"""
+        with self._thread_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with file_lock(os.path.join(self.root, LOCK_NAME)):
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def exists(self):
+        return os.path.exists(self.manifest_path)
+
+    def _read_manifest(self):
+        if not self.exists():
+            return {'columns': self.columns, 'partitions': [], 'next_id': 0, 'generation': 0}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def position(self):
+        """(generation, partition count) marker for load_since"""
+        manifest = self._read_manifest()
+        return manifest.get('generation', 0), len(manifest['partitions'])
+
+    def partition_count(self):
+        return len(self._read_manifest()['partitions'])
+
+    def _write_partition(self, manifest, df):
+        values = np.asfortranarray(df.reindex(columns=manifest['columns']).to_numpy(dtype=np.float64))
+        name = f"part-{manifest['next_id']:06d}.npy"
+        tmp_path = os.path.join(self.root, f"{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, os.path.join(self.root, name))
+        manifest['next_id'] += 1
+        return {'file': name, 'rows': int(len(values))}
+
+    def append(self, df):
+        """Write df as a new partition; cost is proportional to len(df), not to the store size"""
+        if len(df) == 0:
+            return 0
+        with self.lock():
+            manifest = self._read_manifest()
+            manifest['partitions'].append(self._write_partition(manifest, df))
+            self._write_manifest(manifest)
+        return len(df)
+
+    def _frame(self, manifest, partitions, mmap):
+        arrays = [np.load(os.path.join(self.root, p['file']), mmap_mode='r' if mmap else None) for p in partitions]
+        if not arrays:
+            return pd.DataFrame(columns=self.columns)
+        # A single (compacted) partition is wrapped without copying, so with mmap=True it stays on disk
+        values = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        df = pd.DataFrame(values, columns=manifest['columns'], copy=False)
+        return df.reindex(columns=self.columns)
+
+    def load(self, mmap=False):
+        """Read every partition back into a single DataFrame"""
+        df, _ = self.load_since(None, mmap)
+        return df
+
+    def load_since(self, position, mmap=False):
+        """Rows appended after position, plus the new position to pass next time.
+
+        position is None for a full read. If the store was compacted since position was taken,
+        the full contents are returned and the caller should replace rather than extend its copy.
+        """
+        manifest = self._read_manifest()
+        generation = manifest.get('generation', 0)
+        start = position[1] if position is not None and position[0] == generation else 0
+        return self._frame(manifest, manifest['partitions'][start:], mmap), (generation, len(manifest['partitions']))
+
+    def compact(self):
+        """Merge all partitions into one, dropping the old files once the manifest points at the merged one"""
+        with self.lock():
+            manifest = self._read_manifest()
+            if len(manifest['partitions']) <= 1:
+                return
+            old_files = [p['file'] for p in manifest['partitions']]
+            manifest['partitions'] = [self._write_partition(manifest, self.load())]
+            manifest['generation'] = manifest.get('generation', 0) + 1
+            self._write_manifest(manifest)
+        for name in old_files:
+            os.remove(os.path.join(self.root, name))
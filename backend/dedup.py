@@ -0,0 +1,120 @@
+"""Hash index of training rows already stored, used to drop duplicate rows on ingestion.
+
+Rows are keyed by a 64-bit hash of their float32-rounded feature values, so a row parsed as float32
+matches the same row stored as float64. KOI identifiers (e.g. kepoi_name) seen during ingestion are
+indexed as well, in an append-only file of (hash, label) records that every worker process reads.
+Each key maps to its stored label, so a re-export that changes a KOI's disposition is reported as
+conflicting rather than counted as a plain duplicate.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def feature_keys(df, feature_columns):
+    """uint64 hash per row of df's feature values"""
+    if len(df) == 0:
+        return np.empty(0, dtype=np.uint64)
+    values = pd.DataFrame(df[feature_columns].to_numpy(dtype=np.float32), copy=False)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def id_keys(ids):
+    """uint64 hash per identifier, treating blank identifiers as missing (0)"""
+    ids = pd.Series(ids, dtype=object)
+    missing = ids.isna().to_numpy()
+    ids = ids.astype(str).str.strip().to_numpy(dtype=object)
+    keys = pd.util.hash_array(ids)
+    keys[missing | (ids == '')] = 0
+    return keys
+
+
+class DedupIndex:
+    """In-memory maps of feature-row and identifier hashes to their stored label, with O(1) lookup per row"""
+
+    def __init__(self, feature_columns, id_path, label_column='label'):
+        self.feature_columns = list(feature_columns)
+        self.label_column = label_column
+        self.id_path = id_path
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._ids = {}
+        self._id_offset = 0
+        self.ready = False
+
+    def _row_labels(self, df):
+        return dict(zip(feature_keys(df, self.feature_columns).tolist(), df[self.label_column].to_numpy(dtype=np.float64).tolist()))
+
+    def rebuild(self, df):
+        """Index every row of df (the full training history) and every identifier on disk"""
+        with self._lock:
+            self._rows = self._row_labels(df)
+            self._ids, self._id_offset = {}, 0
+            self._read_ids()
+            self.ready = True
+
+    def add_rows(self, df):
+        """Index rows appended to the training history, by this or any other process"""
+        with self._lock:
+            if self.ready:
+                self._rows.update(self._row_labels(df))
+                self._read_ids()
+
+    def _read_ids(self):
+        # Records are (identifier hash, label as float64 bits); a partly written trailing record is left for later
+        if not os.path.exists(self.id_path):
+            return
+        with open(self.id_path, 'rb') as f:
+            f.seek(self._id_offset)
+            data = f.read()
+        usable = len(data) - len(data) % 16
+        records = np.frombuffer(data[:usable], dtype=np.uint64).reshape(-1, 2)
+        self._ids.update(zip(records[:, 0].tolist(), records[:, 1].view(np.float64).tolist()))
+        self._id_offset += usable
+
+    @staticmethod
+    def _match(index, keys, labels, valid):
+        """(duplicate, conflicting) masks of keys seen in index or earlier in keys; conflicting = different label"""
+        known = np.fromiter((index.get(key, np.nan) for key in keys.tolist()), dtype=np.float64, count=len(keys))
+        series = pd.Series(labels)
+        repeated = pd.Series(keys).duplicated().to_numpy() & valid
+        first = series.groupby(keys).transform('first').to_numpy()
+        seen = ~np.isnan(known) & valid
+        duplicate = seen | repeated
+        conflicting = (seen & (known != labels)) | (repeated & (first != labels))
+        return duplicate, conflicting
+
+    def check_rows(self, df, ids=None):
+        """(new, conflicting) masks over df's rows.
+
+        A row is not new when its identifier (if it has one) or its feature values were seen before, in
+        the index or earlier in df. Such a row is conflicting when that earlier row had a different label.
+        """
+        rows = feature_keys(df, self.feature_columns)
+        labels = df[self.label_column].to_numpy(dtype=np.float64)
+        with self._lock:
+            duplicate, conflicting = self._match(self._rows, rows, labels, np.ones(len(rows), dtype=bool))
+            if ids is not None:
+                id_duplicate, id_conflicting = self._match(self._ids, ids, labels, ids != 0)
+                duplicate |= id_duplicate
+                conflicting |= id_conflicting
+        return ~duplicate, conflicting
+
+    def record_ids(self, ids, labels):
+        """Persist the identifiers and labels of accepted rows; call under the data store lock, after appending them"""
+        ids = np.asarray(ids, dtype=np.uint64)
+        labels = np.asarray(labels, dtype=np.float64)
+        has_id = ids != 0
+        if not has_id.any():
+            return
+        records = np.column_stack([ids[has_id], labels[has_id].view(np.uint64)])
+        with open(self.id_path, 'ab') as f:
+            f.write(records.tobytes())
+        with self._lock:
+            self._read_ids()
+
+    def stats(self):
+        with self._lock:
+            return {'indexed_rows': len(self._rows), 'indexed_ids': len(self._ids), 'ready': self.ready}
@@ -0,0 +1,23 @@
+"""Multi-process serving: gunicorn -c gunicorn.conf.py app:app
+
+Each worker loads the model from the saved artifacts and memory-maps the shared data store.
+Retrains run in whichever worker received the upload and are published through model_version.json,
+which the other workers watch and hot-swap from.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('SARMAD_SHARED_STATE', '1')
+
+bind = os.environ.get('SARMAD_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('SARMAD_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('SARMAD_THREADS', 4))
+timeout = int(os.environ.get('SARMAD_WORKER_TIMEOUT', 120))
+# Not preloaded: the warm-up, micro-batch and sync threads must start inside each worker, after the fork
+preload_app = False
+
+
+def post_worker_init(worker):
+    import app
+    app.initialize_system()
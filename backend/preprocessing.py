@@ -0,0 +1,89 @@
+"""Schema-driven cleaning of KOI CSVs, shared by uploads, the Kepler bootstrap and the test-set loader.
+
+A CSV is parsed once, keeping only the schema columns with float32 dtype hints, and then cleaned in a
+single vectorised pass that writes straight into the output array. Rejected rows are counted by
+reason from the same masks used to filter them.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+FEATURE_DTYPE = np.float32
+DISPOSITION_COLUMN = 'koi_disposition'
+LABEL_COLUMN = 'label'
+
+
+def read_koi_csv(source, feature_columns, extra_columns=(), compression='infer'):
+    """Parse only the feature, label and disposition columns (plus extra_columns, as text) of a CSV path or file object.
+
+    Feature and label columns are parsed straight to float32. If a column holds non-numeric text, the
+    CSV is parsed again without dtype hints and such values become NaN (the row is then rejected).
+    """
+    text_dtypes = {DISPOSITION_COLUMN: 'category', **{col: str for col in extra_columns}}
+    wanted = set(feature_columns) | {LABEL_COLUMN} | set(text_dtypes)
+    dtypes = {col: FEATURE_DTYPE for col in list(feature_columns) + [LABEL_COLUMN]}
+    dtypes.update(text_dtypes)
+    start = source.tell() if hasattr(source, 'tell') else None
+    try:
+        return pd.read_csv(source, usecols=lambda col: col in wanted, dtype=dtypes, compression=compression)
+    except ValueError:
+        if start is None and not isinstance(source, (str, os.PathLike)):
+            raise
+        if start is not None:
+            source.seek(start)
+    df = pd.read_csv(source, usecols=lambda col: col in wanted, dtype=text_dtypes, compression=compression)
+    for col in df.columns:
+        if col not in text_dtypes and df[col].dtype == object:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def clean_koi_frame(df, feature_columns, label_map, keep_columns=()):
+    """Return (frame of feature_columns + label as float32, report) for a parsed KOI frame.
+
+    Labels come from 'label', or, where it is absent or blank, from 'koi_disposition' through label_map.
+    Feature columns absent from the CSV are filled with 0; rows whose label is missing or not one of
+    label_map's values, or that miss any present feature, are rejected. keep_columns present in df are
+    carried over unchanged for the accepted rows.
+    """
+    n_rows, n_features = len(df), len(feature_columns)
+    present = [j for j, col in enumerate(feature_columns) if col in df.columns]
+    values = np.zeros((n_rows, n_features + 1), dtype=FEATURE_DTYPE, order='F')
+    for j in present:
+        values[:, j] = df[feature_columns[j]].to_numpy(dtype=FEATURE_DTYPE, na_value=np.nan)
+    values[:, n_features] = np.nan
+    if LABEL_COLUMN in df.columns:
+        values[:, n_features] = df[LABEL_COLUMN].to_numpy(dtype=FEATURE_DTYPE, na_value=np.nan)
+    if DISPOSITION_COLUMN in df.columns:
+        # Rows without a label (e.g. raw uploads kept in the legacy all_data.csv) take their disposition's
+        unlabelled = np.isnan(values[:, n_features])
+        if unlabelled.any():
+            mapped = df[DISPOSITION_COLUMN].map(label_map).to_numpy(dtype=FEATURE_DTYPE, na_value=np.nan)
+            values[unlabelled, n_features] = mapped[unlabelled]
+
+    missing_label = np.isnan(values[:, n_features])
+    # A stray class (e.g. 7) would be stored for good and break every later full refit
+    invalid_label = ~missing_label & ~np.isin(values[:, n_features], np.array(sorted(set(label_map.values())), dtype=FEATURE_DTYPE))
+    missing_feature = np.isnan(values[:, :n_features])
+    any_missing = missing_feature.any(axis=1)
+    empty = missing_label & missing_feature[:, present].all(axis=1)
+    bad_label = missing_label | invalid_label
+    keep = ~(bad_label | any_missing)
+    report = {
+        'rows_read': n_rows, 'rows_accepted': int(keep.sum()),
+        'rejected': {'empty': int(empty.sum()), 'missing_label': int((missing_label & ~empty).sum()),
+                     'invalid_label': int(invalid_label.sum()), 'missing_features': int((any_missing & ~bad_label).sum())},
+        'defaulted_columns': [col for col in feature_columns if col not in df.columns]
+    }
+    filtered = not keep.all()
+    cleaned = pd.DataFrame(values[keep] if filtered else values, columns=list(feature_columns) + [LABEL_COLUMN], copy=False)
+    for col in keep_columns:
+        if col in df.columns:
+            cleaned[col] = df[col].to_numpy()[keep] if filtered else df[col].to_numpy()
+    return cleaned, report
+
+
+def load_koi_csv(source, feature_columns, label_map):
+    """read_koi_csv followed by clean_koi_frame: (cleaned frame, rejection report)"""
+    return clean_koi_frame(read_koi_csv(source, feature_columns), feature_columns, label_map)
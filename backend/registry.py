@@ -0,0 +1,129 @@
+"""Local registry of versioned model artifacts.
+
+Each registered version gets its own immutable directory holding the native model, scaler,
+imputation medians and metrics. registry.json records every version and the promotion history, so
+the production model can be rolled back to any earlier version.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+import joblib
+from xgboost import XGBClassifier
+
+from datastore import file_lock
+
+INDEX_NAME = "registry.json"
+LOCK_NAME = ".lock"
+MODEL_FILE = "model.ubj"
+SCALER_FILE = "scaler.pkl"
+MEDIANS_FILE = "medians.pkl"
+METRICS_FILE = "metrics.json"
+
+
+class ModelRegistry:
+    """Directory of versioned model artifacts plus a production pointer with history"""
+
+    def __init__(self, root, max_versions=20, rollback_depth=5):
+        self.root = root
+        self.max_versions = max(1, int(max_versions))
+        self.rollback_depth = max(1, int(rollback_depth))
+        self.index_path = os.path.join(root, INDEX_NAME)
+
+    def _lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        return file_lock(os.path.join(self.root, LOCK_NAME))
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {'production': None, 'history': [], 'versions': {}}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _version_dir(self, version):
+        # ISO timestamps contain ':' which is not allowed in Windows paths
+        return os.path.join(self.root, str(version).replace(':', '-'))
+
+    def register(self, version, model, scaler, medians, metrics):
+        """Write a version's artifacts into their own directory; the directory appears only once complete"""
+        final_dir = self._version_dir(version)
+        tmp_dir = f"{final_dir}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        model.save_model(os.path.join(tmp_dir, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        joblib.dump({'model_version': version, 'medians': medians}, os.path.join(tmp_dir, MEDIANS_FILE))
+        with open(os.path.join(tmp_dir, METRICS_FILE), 'w') as f:
+            json.dump(metrics, f, indent=2)
+        with self._lock():
+            if os.path.exists(final_dir):
+                shutil.rmtree(final_dir)
+            os.replace(tmp_dir, final_dir)
+            index = self._read_index()
+            index['versions'][version] = {
+                'dir': os.path.basename(final_dir), 'registered_at': datetime.now().isoformat(),
+                'accuracy': metrics.get('accuracy'), 'test_accuracy': metrics.get('test_accuracy'),
+                'total_samples': metrics.get('total_samples'), 'mode': metrics.get('training', {}).get('mode')
+            }
+            self._prune(index)
+            self._write_index(index)
+        return final_dir
+
+    def _prune(self, index):
+        """Drop the oldest versions beyond max_versions, keeping the last rollback_depth production models"""
+        del index['history'][:-100]
+        keep = set(index['history'][-self.rollback_depth:]) | {index['production']}
+        removable = [v for v in index['versions'] if v not in keep]
+        for version in removable[:max(0, len(index['versions']) - self.max_versions)]:
+            shutil.rmtree(os.path.join(self.root, index['versions'].pop(version)['dir']), ignore_errors=True)
+
+    def has(self, version):
+        return version in self._read_index()['versions']
+
+    def load(self, version):
+        """(model, scaler, medians, metrics) of a registered version"""
+        entry = self._read_index()['versions'].get(version)
+        if entry is None:
+            raise KeyError(f"Unknown model version: {version}")
+        path = os.path.join(self.root, entry['dir'])
+        model = XGBClassifier()
+        model.load_model(os.path.join(path, MODEL_FILE))
+        with open(os.path.join(path, METRICS_FILE), 'r') as f:
+            metrics = json.load(f)
+        return model, joblib.load(os.path.join(path, SCALER_FILE)), joblib.load(os.path.join(path, MEDIANS_FILE))['medians'], metrics
+
+    def set_production(self, version, reason):
+        """Record version as the production model"""
+        with self._lock():
+            index = self._read_index()
+            index['production'] = version
+            index['history'].append(version)
+            index['retrain_hold_rows'] = 0
+            entry = index['versions'].get(version)
+            if entry is not None:
+                entry.update(promoted_at=datetime.now().isoformat(), promotion_reason=reason)
+            self._write_index(index)
+
+    def record_rejection(self, version, reason, buffer_rows=0):
+        """Record a rejected candidate and the buffered rows it was trained on"""
+        with self._lock():
+            index = self._read_index()
+            entry = index['versions'].get(version)
+            if entry is not None:
+                entry.update(rejected_at=datetime.now().isoformat(), rejection_reason=reason)
+            index['retrain_hold_rows'] = int(buffer_rows)
+            self._write_index(index)
+
+    def retrain_hold(self):
+        """Buffered rows at the last rejection since a model was promoted (0 if none)"""
+        return self._read_index().get('retrain_hold_rows', 0)
+
+    def summary(self):
+        """Registry index: every version's headline metrics, the production version and promotion history"""
+        return self._read_index()
@@ -0,0 +1,92 @@
+"""Shadow scoring of a candidate model against live prediction traffic."""
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+
+class ShadowScorer:
+    """Re-scores a sample of production requests with a candidate InferenceEngine on a background thread.
+
+    offer() only enqueues work, so the request that produced the production probabilities never waits
+    on the candidate. When max_pending samples are already queued, further samples are dropped.
+    """
+
+    def __init__(self, sample_rate=0.1, max_pending=64, max_rows_per_request=1000):
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.max_pending = max(1, int(max_pending))
+        self.max_rows_per_request = max(1, int(max_rows_per_request))
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sarmad-shadow')
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._pending = 0
+        self.engine = None
+        self._reset(None)
+
+    def _reset(self, engine):
+        self.engine = engine
+        self.started_at = datetime.now().isoformat() if engine is not None else None
+        self.requests = self.rows = self.agreements = self.dropped = self.errors = 0
+        self.abs_proba_diff = 0.0
+        self.production_labels = np.zeros(3, dtype=np.int64)
+        self.candidate_labels = np.zeros(3, dtype=np.int64)
+
+    def start(self, engine):
+        """Shadow engine from now on, starting its comparison counters from zero"""
+        with self._lock:
+            self._reset(engine)
+
+    def stop(self):
+        with self._lock:
+            self._reset(None)
+
+    def offer(self, rows, production_proba):
+        """Maybe queue raw rows (NaN = missing) and their production probabilities for candidate scoring"""
+        engine = self.engine
+        if engine is None or self._rng.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        n = self.max_rows_per_request
+        rows = np.array(rows, dtype=np.float64).reshape(-1, engine.n_features)[:n]
+        production = np.array(production_proba, dtype=np.float64).reshape(-1, np.shape(production_proba)[-1])[:n]
+        self._executor.submit(self._score, engine, rows, production)
+        return True
+
+    def _score(self, engine, rows, production):
+        try:
+            candidate = engine.predict_proba(rows)
+            production_pred, candidate_pred = production.argmax(axis=1), candidate.argmax(axis=1)
+            with self._lock:
+                if engine is not self.engine:  # Candidate replaced while this sample was queued
+                    return
+                self.requests += 1
+                self.rows += len(rows)
+                self.agreements += int(np.sum(production_pred == candidate_pred))
+                self.abs_proba_diff += float(np.abs(candidate - production).sum(axis=1).sum()) / 2
+                self.production_labels += np.bincount(production_pred, minlength=3)[:3]
+                self.candidate_labels += np.bincount(candidate_pred, minlength=3)[:3]
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            engine = self.engine
+            return {
+                'candidate_version': engine.version if engine is not None else None, 'started_at': self.started_at,
+                'sample_rate': self.sample_rate, 'sampled_requests': self.requests, 'sampled_rows': self.rows,
+                'agreement_rate': round(self.agreements / self.rows, 4) if self.rows else None,
+                # Total variation distance between the two models' class probabilities, averaged over rows
+                'mean_proba_distance': round(self.abs_proba_diff / self.rows, 4) if self.rows else None,
+                'production_label_counts': self.production_labels.tolist(), 'candidate_label_counts': self.candidate_labels.tolist(),
+                'pending': self._pending, 'dropped': self.dropped, 'errors': self.errors
+            }
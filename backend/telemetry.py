@@ -0,0 +1,195 @@
+"""Per-request stage tracing and Prometheus text-format metrics, without a client library dependency."""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+RATIO_BUCKETS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if value not in (float('inf'), float('-inf')) else ('+Inf' if value > 0 else '-Inf')
+
+
+class Metric:
+    """Base for named metrics with an optional fixed set of label names"""
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}")
+        return lines
+
+
+class Gauge(Metric):
+    """Value read from fn at scrape time; fn returns a number, or a {labelvalues: number} dict"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, fn, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def render(self):
+        lines = self.header()
+        values = self.fn()
+        for labelvalues, value in (values.items() if isinstance(values, dict) else [((), values)]):
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+        return lines
+
+
+class Counter(Gauge):
+    """Monotonic total read from fn at scrape time"""
+    kind = 'counter'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+def current_rss_bytes():
+    """Resident set size of this process right now, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """Context manager sampling this process's RSS on a background thread while its block runs.
+
+    Unlike ru_maxrss, which is the high-water mark of the whole process lifetime, the peak covers
+    only the block, and growth is that peak minus the RSS on entry.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start = self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start = self.peak = current_rss_bytes()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._run, name='sarmad-rss', daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        return False
+
+    def report(self, prefix):
+        """{prefix_peak_rss_mb, prefix_rss_growth_mb}, empty where RSS cannot be read"""
+        if self.start is None:
+            return {}
+        mb = 1024 * 1024
+        return {f'{prefix}_peak_rss_mb': round(self.peak / mb, 1), f'{prefix}_rss_growth_mb': round((self.peak - self.start) / mb, 1)}
+
+
+class RequestTrace:
+    """Stage timings for one request, each also observed into a {endpoint, stage} histogram"""
+
+    def __init__(self, endpoint, stage_histogram):
+        self.endpoint = endpoint
+        self.stage_histogram = stage_histogram
+        self.started = time.perf_counter()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.stages.append((name, seconds))
+        self.stage_histogram.observe(seconds, self.endpoint, name)
+
+    def record_all(self, timings):
+        for name, seconds in timings.items():
+            self.record(name, seconds)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value, with repeated stages (e.g. per streamed chunk) summed"""
+        totals = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in totals.items())
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+import app as server
+from datastore import PartitionStore
+
+
+@pytest.fixture
+def fresh_app(tmp_path, monkeypatch):
+    """The app module with its data files in tmp_path and no training history loaded"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(server, 'data_store', PartitionStore(str(tmp_path / server.DATA_STORE_DIR), server.feature_columns + ['label']))
+    monkeypatch.setitem(server.warmup_state, 'stages', {})
+    for name in ('all_data', 'label_counts', 'store_position'):
+        monkeypatch.setattr(server, name, getattr(server, name))
+    return server
+
+
+def koi_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.lognormal(1.0, 1.0, (n, len(server.feature_columns))), columns=server.feature_columns)
+
+
+def test_legacy_csv_is_cleaned_on_migration(fresh_app, tmp_path):
+    # Kepler rows were stored with a label; template uploads were appended raw, with only a disposition
+    labelled = koi_rows(30, 0).assign(label=np.arange(30) % 3)
+    uploaded = koi_rows(6, 1).assign(koi_disposition=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE', 'NOT DISPOSITIONED', '', 'CONFIRMED'])
+    uploaded.loc[5, 'koi_prad'] = np.nan
+    pd.concat([labelled, uploaded], ignore_index=True).to_csv(tmp_path / fresh_app.DATA_CSV, index=False)
+
+    loaded = fresh_app.ensure_training_data()
+    assert len(loaded) == 33
+    assert loaded['label'].tolist()[30:] == [2, 1, 0]
+    stored = fresh_app.data_store.load()
+    assert len(stored) == 33 and set(stored['label'].unique()) == {0, 1, 2}
+
+
+def test_legacy_csv_without_label_column_is_migrated(fresh_app, tmp_path):
+    koi_rows(9, 2).assign(koi_disposition=['CONFIRMED', 'CANDIDATE', 'FALSE POSITIVE'] * 3).to_csv(tmp_path / fresh_app.DATA_CSV, index=False)
+    loaded = fresh_app.ensure_training_data()
+    assert loaded['label'].tolist() == [2, 1, 0] * 3
+    assert fresh_app.data_store.load()['label'].notna().all()
+
+
+@pytest.fixture
+def serving_app(fresh_app, monkeypatch):
+    """fresh_app serving a small model"""
+    for name in ('model', 'scaler', 'feature_medians', 'model_version', 'current_metrics', 'inference_engine'):
+        monkeypatch.setattr(fresh_app, name, getattr(fresh_app, name))
+    X = koi_rows(300, 3).to_numpy()
+    y = np.arange(300) % 3
+    scaler = StandardScaler().fit(X)
+    model = XGBClassifier(objective='multi:softmax', num_class=3, n_estimators=5, max_depth=2).fit(scaler.transform(X), y)
+    fresh_app.swap_model(model, scaler, pd.Series(np.median(X, axis=0), index=fresh_app.feature_columns), 'v1', {})
+    return fresh_app
+
+
+def test_stats_etag_survives_predictions(serving_app):
+    client = serving_app.app.test_client()
+    first = client.get('/stats')
+    assert first.status_code == 200 and first.headers['ETag']
+    row = koi_rows(1, 4).iloc[0].to_dict()
+    assert client.post('/predict_manual', json=row).status_code == 200
+    assert client.get('/stats', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    runtime = client.get('/stats/runtime').get_json()
+    assert runtime['predict_manual']['latency']['count'] >= 1
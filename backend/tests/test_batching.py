@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_concurrent_rows_get_their_own_results():
+    batcher = MicroBatcher(lambda rows: rows * 2, max_batch_size=8, max_wait_ms=5)
+    rows = np.arange(200, dtype=float).reshape(100, 2)
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda row: batcher.submit(row).result(timeout=5), rows))
+    assert np.array_equal(np.vstack(results), rows * 2)
+    stats = batcher.stats()
+    assert stats['rows'] == 100 and stats['batches'] <= 100
+
+
+def test_scoring_errors_reach_every_waiting_request():
+    def fail(rows):
+        raise ValueError("boom")
+    batcher = MicroBatcher(fail, max_wait_ms=1)
+    with pytest.raises(ValueError, match="boom"):
+        batcher.submit(np.zeros(2)).result(timeout=5)
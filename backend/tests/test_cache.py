@@ -0,0 +1,18 @@
+import numpy as np
+
+from cache import PredictionCache, row_keys
+
+
+def test_row_keys_match_equal_vectors_per_version():
+    rows = np.array([[1.0, np.nan, 0.0], [1.0, -np.nan, -0.0], [1.0, 2.0, 0.0]])
+    keys = row_keys(rows, 'v1')
+    assert keys[0] == keys[1] != keys[2]
+    assert row_keys(rows[:1], 'v2')[0] != keys[0]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PredictionCache(2)
+    cache.put_many([1, 2], ['a', 'b'])
+    cache.get_many([1])
+    cache.put_many([3], ['c'])
+    assert cache.get_many([1, 2, 3]) == ['a', None, 'c']
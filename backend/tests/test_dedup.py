@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from dedup import DedupIndex, feature_keys, id_keys
+
+FEATURES = ['a', 'b']
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=FEATURES + ['label'], dtype=np.float64)
+
+
+def make_index(tmp_path, stored=()):
+    index = DedupIndex(FEATURES, str(tmp_path / 'koi_index.bin'))
+    index.rebuild(frame(list(stored)))
+    return index
+
+
+def test_feature_keys_match_float32_parsed_rows_against_float64_stored_rows():
+    stored = frame([[0.1, 1e-7, 0]])
+    parsed = stored.astype(np.float32)
+    assert feature_keys(stored, FEATURES).tolist() == feature_keys(parsed, FEATURES).tolist()
+
+
+def test_id_keys_treat_blank_and_missing_ids_as_absent():
+    keys = id_keys(['K1', ' K1 ', '', '  ', None, np.nan, 'K2'])
+    assert keys[0] == keys[1] != keys[6]
+    assert keys[2:6].tolist() == [0, 0, 0, 0]
+
+
+def test_stored_and_repeated_rows_are_not_new(tmp_path):
+    index = make_index(tmp_path, [[1, 1, 0]])
+    new, conflicting = index.check_rows(frame([[1, 1, 0], [2, 2, 1], [2, 2, 1], [3, 3, 2]]))
+    assert new.tolist() == [False, True, False, True]
+    assert not conflicting.any()
+
+
+def test_label_changes_are_reported_as_conflicting(tmp_path):
+    index = make_index(tmp_path, [[1, 1, 0]])
+    new, conflicting = index.check_rows(frame([[1, 1, 2], [5, 5, 1], [5, 5, 0]]))
+    assert new.tolist() == [False, True, False]
+    assert conflicting.tolist() == [True, False, True]
+
+
+def test_ids_are_shared_through_the_index_file(tmp_path):
+    writer = make_index(tmp_path)
+    ids = id_keys(['K1', 'K2'])
+    writer.record_ids(ids, [1.0, 2.0])
+    # Another worker's index picks the ids up from disk
+    reader = make_index(tmp_path)
+    new, conflicting = reader.check_rows(frame([[7, 7, 1], [8, 8, 0], [9, 9, 0]]), id_keys(['K1', 'K2', '']))
+    assert new.tolist() == [False, False, True]
+    assert conflicting.tolist() == [False, True, False]
+
+
+def test_partly_written_id_records_are_read_once_complete(tmp_path):
+    index = make_index(tmp_path)
+    record = np.array([id_keys(['K1'])[0], np.float64(1.0).view(np.uint64)], dtype=np.uint64).tobytes()
+    with open(index.id_path, 'ab') as f:
+        f.write(record[:10])
+    index.add_rows(frame([]))
+    assert index.stats()['indexed_ids'] == 0
+    with open(index.id_path, 'ab') as f:
+        f.write(record[10:])
+    index.add_rows(frame([]))
+    assert index.stats()['indexed_ids'] == 1
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from inference import InferenceEngine
+
+N_FEATURES = 6
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.lognormal(1.0, 1.0, (600, N_FEATURES))
+    y = (X[:, 0] > 3).astype(int) + (X[:, 1] > 5).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = XGBClassifier(objective='multi:softmax', num_class=3, n_estimators=20, max_depth=3, random_state=0)
+    model.fit(scaler.transform(X), y)
+    medians = pd.Series(np.median(X, axis=0))
+    return model, scaler, medians, rng.lognormal(1.0, 1.0, (400, N_FEATURES))
+
+
+def sklearn_proba(model, scaler, medians, rows):
+    """The pandas/sklearn path the engine replaces"""
+    return model.predict_proba(scaler.transform(pd.DataFrame(rows).fillna(medians).astype(float)))
+
+
+def test_engine_matches_sklearn_path_exactly(fitted):
+    model, scaler, medians, rows = fitted
+    rows = rows.copy()
+    rows[::3, 2] = np.nan
+    rows[::7] = np.nan
+    engine = InferenceEngine(model, scaler, medians, 'v1')
+    assert np.array_equal(engine.predict_proba(rows), sklearn_proba(model, scaler, medians, rows))
+    for row in rows[:50]:
+        assert np.array_equal(engine.predict_proba(row), sklearn_proba(model, scaler, medians, row[None, :]))
+
+
+def test_engine_accumulates_stage_timings(fitted):
+    model, scaler, medians, rows = fitted
+    timings = {}
+    InferenceEngine(model, scaler, medians).predict_proba(rows, timings)
+    assert set(timings) == {'impute', 'scale', 'predict'}
+    assert all(seconds >= 0 for seconds in timings.values())
@@ -0,0 +1,57 @@
+import io
+
+import numpy as np
+
+from preprocessing import clean_koi_frame, read_koi_csv
+
+FEATURES = ['a', 'b', 'c']
+LABEL_MAP = {'CONFIRMED': 2, 'CANDIDATE': 1, 'FALSE POSITIVE': 0}
+
+
+def clean(csv, **kwargs):
+    return clean_koi_frame(read_koi_csv(io.StringIO(csv), FEATURES), FEATURES, LABEL_MAP, **kwargs)
+
+
+def test_labels_outside_label_map_are_rejected():
+    cleaned, report = clean("a,b,c,label\n1,2,3,7\n1,2,3,2.5\n1,2,3,-1\n4,5,6,2\n4,5,,9\n")
+    assert cleaned['label'].tolist() == [2.0]
+    assert report['rows_accepted'] == 1
+    assert report['rejected'] == {'empty': 0, 'missing_label': 0, 'invalid_label': 4, 'missing_features': 0}
+    assert report['rows_read'] - report['rows_accepted'] == sum(report['rejected'].values())
+
+
+def test_disposition_is_mapped_and_rejections_are_counted_by_reason():
+    csv = ("a,b,koi_disposition,kepoi_name\n1,2,CONFIRMED,K1\n,,,K2\n3,,CANDIDATE,K3\n"
+           "4,5,NOT DISPOSITIONED,K4\n6,7,FALSE POSITIVE,K5\n")
+    df = read_koi_csv(io.StringIO(csv), FEATURES, ['kepoi_name'])
+    cleaned, report = clean_koi_frame(df, FEATURES, LABEL_MAP, ['kepoi_name'])
+    assert cleaned.columns.tolist() == FEATURES + ['label', 'kepoi_name']
+    assert cleaned[FEATURES + ['label']].to_numpy().tolist() == [[1, 2, 0, 2], [6, 7, 0, 0]]
+    assert cleaned['kepoi_name'].tolist() == ['K1', 'K5']
+    assert report['rejected'] == {'empty': 1, 'missing_label': 1, 'invalid_label': 0, 'missing_features': 1}
+    assert report['defaulted_columns'] == ['c']
+
+
+def test_features_and_label_are_float32_without_extra_columns():
+    df = read_koi_csv(io.StringIO("a,b,c,label,other\n1,2,3,0,x\n"), FEATURES)
+    assert list(df.columns) == FEATURES + ['label']
+    assert all(dtype == np.float32 for dtype in df.dtypes)
+    cleaned, report = clean_koi_frame(df, FEATURES, LABEL_MAP)
+    assert all(dtype == np.float32 for dtype in cleaned.dtypes)
+    assert report['rows_accepted'] == 1
+
+
+def test_non_numeric_values_fall_back_to_nan_for_buffers_and_paths(tmp_path):
+    csv = "a,b,c,label\n1,oops,3,1\n2,3,4,0\n"
+    path = tmp_path / 'upload.csv'
+    path.write_text(csv)
+    for source in (io.StringIO(csv), str(path)):
+        cleaned, report = clean_koi_frame(read_koi_csv(source, FEATURES), FEATURES, LABEL_MAP)
+        assert cleaned.to_numpy().tolist() == [[2, 3, 4, 0]]
+        assert report['rejected']['missing_features'] == 1
+
+
+def test_no_schema_columns_yields_an_empty_frame():
+    cleaned, report = clean("x,y\n1,2\n")
+    assert len(cleaned) == 0 and report['rows_read'] == 0
+    assert report['defaulted_columns'] == FEATURES